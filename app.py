@@ -1,5 +1,129 @@
+import math
+from collections import OrderedDict
 import pygame
-from minesweeper import Minesweeper
+from minesweeper import Minesweeper, GameStatus
+from solver import Solver
+from probability import ProbabilityEngine
+from generator import BoardGenerator, buildBoard
+import savegame
+from replay import Recorder, Replay, REVEAL, FLAG, TICK
+
+REGULAR_FONT = 'resources/fonts/MinecraftRegular-Bmg3.otf'
+BOLD_FONT = 'resources/fonts/MinecraftBold-nMK1.otf'
+
+class Assets:
+    '''loads every image, font and sound from disk once. converted and scaled image variants are
+    cached by (path, size, alpha, scaler), so switching scenes never touches the disk.
+    images are shared, so callers must not draw onto them'''
+
+    def __init__(self):
+        self.sources = {}
+        self.images = {}
+        self.fonts = {}
+        self.sounds = {}
+
+    def image(self, path, size = None, alpha = False, scaler = 'scale'):
+        '''returns the image at path, converted for the display. size scales it with the pygame.transform
+        function named by scaler, 'scale2x' doubles it instead'''
+        key = (path, size, alpha, scaler)
+        if key in self.images:
+            return self.images[key]
+
+        if path not in self.sources:
+            self.sources[path] = pygame.image.load(path)
+        surf = self.sources[path].convert_alpha() if alpha else self.sources[path].convert()
+        if scaler == 'scale2x':
+            surf = pygame.transform.scale2x(surf)
+        elif size is not None:
+            surf = getattr(pygame.transform, scaler)(surf, size)
+
+        self.images[key] = surf
+        return surf
+
+    def font(self, path, size):
+        if (path, size) not in self.fonts:
+            self.fonts[(path, size)] = pygame.font.Font(path, size)
+        return self.fonts[(path, size)]
+
+    def sound(self, path):
+        if path not in self.sounds:
+            self.sounds[path] = pygame.mixer.Sound(path)
+        return self.sounds[path]
+
+class TextCache:
+    '''renders each (font, size, text, color, scale) once and keeps the most recently used renders.
+    renders are shared, so callers must not draw onto them'''
+
+    def __init__(self, assets, max_size = 256):
+        self.assets = assets
+        self.max_size = max_size
+        self.renders = OrderedDict()
+
+    def render(self, path, size, text, color = 'white', scale = 1):
+        key = (path, size, str(text), color, scale)
+        surf = self.renders.get(key)
+        if surf is not None:
+            self.renders.move_to_end(key)
+            return surf
+
+        surf = self.assets.font(path, size).render(str(text), False, color)
+        if scale != 1:
+            surf = pygame.transform.rotozoom(surf, 0, scale)
+        self.renders[key] = surf
+        if len(self.renders) > self.max_size:
+            self.renders.popitem(last = False)
+        return surf
+
+BUTTON_IMAGE = 'resources/graphics/global/menu_button_unselected.png'
+BUTTON_SELECTED_IMAGE = 'resources/graphics/global/menu_button_selected.png'
+
+class Button:
+    '''menu button with a label. hovering swaps which of its two shared surfaces is drawn,
+    so nothing is allocated per frame'''
+
+    def __init__(self, surf, selected_surf, rect, label, callback = None):
+        self.surf = surf
+        self.selected_surf = selected_surf
+        self.rect = rect
+        self.label = label
+        self.label_rect = label.get_rect(center = rect.center)
+        self.label_rect.centery -= 2 # needed to offset a little
+        self.callback = callback
+
+        self.selected = False
+        self.image = surf
+
+    def hover(self, xy):
+        '''updates the highlight for the mouse at xy. returns True if it changed and the button needs a redraw'''
+        selected = self.rect.collidepoint(xy)
+        if selected == self.selected:
+            return False
+        self.selected = selected
+        self.image = self.selected_surf if selected else self.surf
+        return True
+
+    def draw(self, screen):
+        screen.blit(self.image, self.rect)
+        screen.blit(self.label, self.label_rect)
+
+class Tween:
+    '''progress of an animation from 0 to 1 over a fixed wall clock duration in milliseconds'''
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.elapsed = 0
+
+    def advance(self, milliseconds):
+        self.elapsed = min(self.duration, self.elapsed + milliseconds)
+        return self.progress
+
+    @property
+    def progress(self):
+        return self.elapsed / self.duration if self.duration else 1
+
+    @property
+    def done(self):
+        return self.elapsed >= self.duration
 
 class Scene:
     '''abstract class that scene instances are derived from'''
@@ -10,6 +134,10 @@ class Scene:
     button_click = None
     mine_click = None
     torch_click = None
+    board_generator = None
+    backdrop = None
+    assets = Assets()
+    text_cache = TextCache(assets)
 
     def __init__(self):
         # scenes are automatically added to the render stack when initialized. 
@@ -28,8 +156,66 @@ class Scene:
 
     def drawPrevScene(self):
         '''renders previous scene in the stack. helpful for menus that need to overlay'''
+        self.render_stack[-2].invalidate()
         self.render_stack[-2].draw()
 
+    def drawBackdrop(self, *layers):
+        '''draws the previous scene with layers, (surface, position) pairs, blitted over it.
+        the result is kept as a snapshot and only redrawn when the previous scene has changed'''
+        if self.backdrop is None or self.getPrevScene().changed():
+            self.drawPrevScene()
+            self.screen.blits(layers)
+            self.backdrop = self.screen.copy()
+        else:
+            self.screen.blit(self.backdrop, (0, 0))
+
+    def render_text(self, font, size, text, color = 'white', scale = 1):
+        return self.text_cache.render(font, size, text, color, scale)
+
+    def make_buttons(self, labels, size = None, step = (0, 60), font = REGULAR_FONT, **position):
+        '''returns a Button for each (text, callback) in labels. position places the first button
+        like get_rect keywords, e.g. midtop = (x, y), and each next one is moved by step'''
+        surf = self.assets.image(BUTTON_IMAGE, size, scaler = 'smoothscale')
+        selected_surf = self.assets.image(BUTTON_SELECTED_IMAGE, size, scaler = 'smoothscale')
+        rect = surf.get_rect(**position)
+
+        buttons = []
+        for i, (text, callback) in enumerate(labels):
+            label = self.render_text(font, 24, text)
+            buttons.append(Button(surf, selected_surf, rect.move(step[0] * i, step[1] * i), label, callback))
+        return buttons
+
+    def update_buttons(self):
+        '''highlights the button under the mouse. returns True if any button changed'''
+        xy = pygame.mouse.get_pos()
+        changed = False
+        for button in self.buttons:
+            changed |= button.hover(xy)
+        return changed
+
+    def click_buttons(self, xy):
+        '''runs the callback of the button at xy and returns its result'''
+        for button in self.buttons:
+            if button.rect.collidepoint(xy) and button.callback:
+                self.button_click.play()
+                return button.callback()
+
+    def draw_buttons(self):
+        for button in self.buttons:
+            button.draw(self.screen)
+
+    def newGame(self):
+        '''starts a new game like the one in the previous scene'''
+        prev = self.getPrevScene()
+        prev.leave()
+        self.clearScene()
+        return Game(prev.dim_x, prev.dim_y, prev.num_mines, prev.no_guess)
+
+    def titleScreen(self):
+        self.getPrevScene().leave()
+        self.clearScene()
+        return MainMenu()
+
     def getPrevScene(self):
         '''returns previous scene in the render stack'''
         return self.render_stack[-2]
@@ -44,7 +230,24 @@ class Scene:
     def update(self):
         pass
 
+    def invalidate(self):
+        '''called when the screen no longer shows this scene, e.g. after a scene change'''
+        pass
+
+    def leave(self):
+        '''called when the scene is dropped for good, e.g. for a new game or when the window closes'''
+        pass
+
+    def changed(self):
+        '''returns True if the scene would draw something different than last time'''
+        return False
+
+    def idle(self):
+        '''returns True if the scene only changes on input, so the main loop can sleep until the next event'''
+        return True
+
     def draw(self):
+        # returns a list of changed rects, or None when the whole screen needs to be flipped
         pass
 
 class MainMenu(Scene):
@@ -56,80 +259,40 @@ class MainMenu(Scene):
         self.HEIGHT = 480
         Scene.screen = pygame.display.set_mode((720, 480))
         pygame.display.set_caption('Minecraftsweeper')
-        pygame.display.set_icon(pygame.image.load('resources/graphics/global/minecraftsweeper.png'))
+        pygame.display.set_icon(self.assets.image('resources/graphics/global/minecraftsweeper.png', alpha = True))
 
         # load background
-        self.bg = pygame.image.load('resources/graphics/main_menu/menu_background.png').convert()
+        self.bg = self.assets.image('resources/graphics/main_menu/menu_background.png')
         self.bg_rect = self.bg.get_rect(topleft = (0,0))
 
         self.init_buttons()
 
     def init_buttons(self):
-        button_texts = ['Easy',
-                        'Normal',
-                        'Hard',
-                        'Custom']
-
-        self.button = pygame.image.load('resources/graphics/global/menu_button_unselected.png').convert()
-        self.button_rect = self.button.get_rect(midtop = (self.WIDTH // 2, 200))
-
-        self.button_selected = pygame.image.load('resources/graphics/global/menu_button_selected.png').convert()
-
-        # list of four required buttons and their rects
-        self.buttons = [[self.button.copy(), self.button_rect.copy()] for i in range(len(button_texts))]
-
-        # space the buttons
-        for i, button in enumerate(self.buttons):
-            button[1].top += 60 * i
-
-        # load font
-        font = pygame.font.Font('resources/fonts/MinecraftBold-nMK1.otf', 24)
-
-        # create text renders
-        button_texts_surfs = [font.render(text, False, 'white') for text in button_texts]
-        button_texts_rects = [surf.get_rect() for surf in button_texts_surfs]
-
-        # center text to according button rects
-        for i, rect in enumerate(button_texts_rects):
-            rect.center = self.buttons[i][1].center
-            rect.centery -= 2 # needed to offset a little
-
-        self.button_texts = list(zip(button_texts_surfs, button_texts_rects))
-
-        # button dictionary where key is its text / for easy object lookup
-        self.button_dict = {}
-        for i, text in enumerate(button_texts):
-            self.button_dict[text] = self.buttons[i]
+        self.buttons = self.make_buttons([('Easy', lambda: self.startGame(10, 10, 10)),
+                                          ('Normal', lambda: self.startGame(16, 16, 40)),
+                                          ('Hard', lambda: self.startGame(30, 16, 99)),
+                                          ('Custom', CustomGameMenu)],
+                                         font = BOLD_FONT, midtop = (self.WIDTH // 2, 200))
 
         #-----------------------
-        self.disc = pygame.image.load('resources/graphics/game/disc.png').convert_alpha()
-        self.disc_surf = pygame.transform.scale2x(self.disc)
+        self.disc_surf = self.assets.image('resources/graphics/game/disc.png', alpha = True, scaler = 'scale2x')
         self.disc_rect = self.disc_surf.get_rect()
 
         self.disc_rect.center = (50, self.HEIGHT - 35)
         
-        self.no_music = pygame.image.load('resources/graphics/game/no_music.png').convert_alpha()
-        self.no_music = pygame.transform.scale2x(self.no_music)
+        self.no_music = self.assets.image('resources/graphics/game/no_music.png', alpha = True, scaler = 'scale2x')
+
+    def startGame(self, dim_x, dim_y, num_mines):
+        self.clearScene()
+        return Game(dim_x, dim_y, num_mines, no_guess = True)
 
     def handle(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
                 xy = pygame.mouse.get_pos()
-                if self.buttons[0][1].collidepoint(xy):
-                    self.button_click.play()
-                    self.clearScene()
-                    return Game(10, 10, 10)
-                if self.buttons[1][1].collidepoint(xy):
-                    self.button_click.play()
-                    self.clearScene()
-                    return Game(16, 16, 40)
-                if self.buttons[2][1].collidepoint(xy):
-                    self.button_click.play()
-                    self.clearScene()
-                    return Game(30, 16, 99)
-                if self.buttons[3][1].collidepoint(xy):
-                    self.button_click.play()
-                    return CustomGameMenu()
+                scene = self.click_buttons(xy)
+                if scene:
+                    return scene
 
                 # music toggle
                 if self.disc_rect.collidepoint(xy):
@@ -138,23 +301,31 @@ class MainMenu(Scene):
                     else:
                         Scene.music = True
 
+        # watch the last recorded game
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+            try:
+                replay = Replay.load()
+            except (OSError, ValueError):
+                return
+            self.button_click.play()
+            self.clearScene()
+            return Game_replay(replay)
+
     def update(self):
         # button selection highlighting
-        for button in self.buttons:
-            if button[1].collidepoint(pygame.mouse.get_pos()):
-                button[0] = self.button_selected.copy()
-            else:
-                button[0] = self.button.copy()
+        self.update_buttons()
 
     def draw(self):
         self.screen.blit(self.bg, self.bg_rect)
-        self.screen.blits(blit_sequence = self.buttons)
-        self.screen.blits(blit_sequence = self.button_texts)
+        self.draw_buttons()
         self.screen.blit(self.disc_surf, self.disc_rect)
         if not self.music:
             self.screen.blit(self.no_music, self.disc_rect)
 
 class CustomGameMenu(Scene):
+    # (min, max) of grid height, grid width and mines. large boards scroll inside the game window
+    limits = [(10, 500), (10, 500), (10, 9999)]
+
     def __init__(self):
         super().__init__()
 
@@ -163,54 +334,37 @@ class CustomGameMenu(Scene):
         self.init_input()
 
     def init_bg(self):
-        # load background
-        self.bg = pygame.image.load('resources/graphics/main_menu/custom_game_menu.png').convert()
+        # load background. the ranges printed on it are replaced with the current limits
+        self.bg = self.assets.image('resources/graphics/main_menu/custom_game_menu.png').copy()
         self.bg_rect = self.bg.get_rect(topleft = (0,0))
 
-    def init_buttons(self):
-
-        button_texts = ['Back',
-                        'Start Game']
-
-        self.button = pygame.image.load('resources/graphics/global/menu_button_unselected.png').convert()
-        self.button = pygame.transform.smoothscale(self.button, (200, 47)) # shrink width
-        self.button_rect = self.button.get_rect(midbottom = (240, self.bg_rect.bottom - 30))
-        
-        self.button_selected = pygame.image.load('resources/graphics/global/menu_button_selected.png').convert()
-        self.button_selected = pygame.transform.smoothscale(self.button_selected, (200, 47)) # shrink width
-        
-        # list of buttons and their rects
-        self.buttons = [[self.button.copy(), self.button_rect.copy()] for i in range(len(button_texts))]
-
-        # space the buttons
-        for i, button in enumerate(self.buttons):
-            button[1].right += 250 * i
-
-        # load font
-        self.font = pygame.font.Font('resources/fonts/MinecraftBold-nMK1.otf', 24)
-
-        # create text renders
-        button_texts_surfs = [self.font.render(text, False, 'white') for text in button_texts]
-        button_texts_rects = [surf.get_rect() for surf in button_texts_surfs]
+        stone = self.bg.subsurface((574, 198, 144, 46)).copy()
+        for i, (low, high) in enumerate(self.limits):
+            self.bg.blit(stone, (424, 198 + 63.5 * i))
+            text = self.render_text(BOLD_FONT, 30, f'({low}-{high})')
+            self.bg.blit(text, text.get_rect(midleft = (427, 223 + 63.5 * i)))
 
-        # center text to according button rects
-        for i, rect in enumerate(button_texts_rects):
-            rect.center = self.buttons[i][1].center
-            rect.centery -= 2 # needed to offset a little
-
-        self.button_texts = list(zip(button_texts_surfs, button_texts_rects))
+    def init_buttons(self):
+        # shrink width
+        self.buttons = self.make_buttons([('Back', self.returnToPrev),
+                                          ('Start Game', self.startGame)],
+                                         (200, 47), step = (250, 0), font = BOLD_FONT,
+                                         midbottom = (240, self.bg_rect.bottom - 30))
 
     def init_input(self):
         # box
         num_boxes = 3
 
-        self.input_box = pygame.image.load('resources/graphics/main_menu/input_box.png').convert()
-        self.input_box_selected = pygame.image.load('resources/graphics/main_menu/input_box_selected.png').convert()
+        # widened to fit four digits
+        self.input_box = self.assets.image('resources/graphics/main_menu/input_box.png',
+                                           (84, 47), scaler = 'smoothscale')
+        self.input_box_selected = self.assets.image('resources/graphics/main_menu/input_box_selected.png',
+                                                    (84, 47), scaler = 'smoothscale')
 
-        self.input_box_rect = self.input_box.get_rect(midtop = (175, 200))
+        self.input_box_rect = self.input_box.get_rect(midtop = (168, 200))
 
-        self.input_boxes = [[self.input_box.copy(), self.input_box_rect.copy()] for i in range(num_boxes)]
-        self.input_boxes[0][0] = self.input_box_selected.copy() # start with first box selected
+        self.input_boxes = [[self.input_box, self.input_box_rect.copy()] for i in range(num_boxes)]
+        self.input_boxes[0][0] = self.input_box_selected # start with first box selected
 
         for i, button in enumerate(self.input_boxes):
             button[1].top += 62.5 * i
@@ -228,34 +382,33 @@ class CustomGameMenu(Scene):
         except ValueError:
             return False
 
-        if 10 <= dim_y <= 20:
-            if 10 <= dim_x <= 30:
-                if 10 <= num_mines <= 99:
-                    return True
-        return False
+        # at least one cell has to stay free for the first click
+        if num_mines >= dim_x * dim_y:
+            return False
+        for value, (low, high) in zip((dim_y, dim_x, num_mines), self.limits):
+            if not low <= value <= high:
+                return False
+        return True
+
+    def startGame(self):
+        dim_y, dim_x, num_mines = [int(entry) for entry in self.input_texts]
+        self.replacePrevScene()
+        return Game(dim_x, dim_y, num_mines)
 
     def handle(self, event):
         # button collisions
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             mouse_pos = event.pos
-            if self.buttons[0][1].collidepoint(mouse_pos):
-                self.button_click.play()
-                return self.returnToPrev()
-            if self.buttons[1][1].collidepoint(mouse_pos):
-                if self.validGame():
-                    dim_y, dim_x, num_mines = [int(entry) for entry in self.input_texts]
-                    self.button_click.play()
-                    self.replacePrevScene()
-                    return Game(dim_x, dim_y, num_mines)
-                else:
-                    pass
+            # start stays silent until the inputs make a valid game
+            if not self.buttons[1].rect.collidepoint(mouse_pos) or self.validGame():
+                scene = self.click_buttons(mouse_pos)
+                if scene:
+                    return scene
 
         # keyboard binding to enter game
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_RETURN and self.validGame():
-                dim_y, dim_x, num_mines = [int(entry) for entry in self.input_texts]
-                self.replacePrevScene()
-                return Game(dim_x, dim_y, num_mines)
+                return self.startGame()
 
         # input box collisions
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -291,19 +444,15 @@ class CustomGameMenu(Scene):
                 if event.key == pygame.K_BACKSPACE:
                     self.input_texts[i] = self.input_texts[i][:-1]
                 else:
-                    if event.unicode.isnumeric() and len(self.input_texts[i]) < 2:
+                    if event.unicode.isnumeric() and len(self.input_texts[i]) < len(str(self.limits[i][1])):
                         self.input_texts[i] += event.unicode
 
     def update(self):
         # button selection highlighting
-        for button in self.buttons:
-            if button[1].collidepoint(pygame.mouse.get_pos()):
-                button[0] = self.button_selected.copy()
-            else:
-                button[0] = self.button.copy()
+        self.update_buttons()
 
         # text input rendering
-        input_text_surfs = [self.font.render(text, False, 'white') for text in self.input_texts]
+        input_text_surfs = [self.render_text(BOLD_FONT, 24, text) for text in self.input_texts]
         input_text_rects = [surf.get_rect() for surf in input_text_surfs]
 
         for i, rect in enumerate(input_text_rects):
@@ -313,28 +462,41 @@ class CustomGameMenu(Scene):
 
     def draw(self):
         self.screen.blit(self.bg, self.bg_rect)
-        self.screen.blits(self.buttons)
-        self.screen.blits(self.button_texts)
+        self.draw_buttons()
         self.screen.blits(self.input_boxes)
         self.screen.blits(self.input_text_renders)
 
 class Game(Scene):
-    def __init__(self, dim_x = 10, dim_y = 10, num_mines = 10):
+    digit_glyphs = {} # rendered digits 1 to 8 per font size, shared by every game
+    max_view = (30, 20) # most cells the window shows at the default zoom, bigger boards scroll
+    zoom_levels = (10, 15, 20, 30, 45, 60) # cell sizes in pixels for the mouse wheel
+
+    def __init__(self, dim_x = 10, dim_y = 10, num_mines = 10, no_guess = False, board = None, in_game_time = 0):
         super().__init__()
 
         self.dim_x = dim_x
         self.dim_y = dim_y
         self.num_mines = num_mines
+        self.no_guess = no_guess
         self.ppg = 30 # pixels per (tile) grid
         self.top_border_px = 120
         self.vertical_border_px = 30
         self.bottom_border_px = 60
 
-        self.HEIGHT = self.ppg * self.dim_y + self.bottom_border_px + self.top_border_px
-        self.WIDTH = self.ppg * self.dim_x + self.ppg * 2
+        # the part of the window that shows the board. its size never changes, the camera
+        # is the board pixel at its top left and moves with panning and zooming
+        view_width = min(self.dim_x, self.max_view[0]) * self.ppg
+        view_height = min(self.dim_y, self.max_view[1]) * self.ppg
+        self.view_rect = pygame.Rect(self.vertical_border_px, self.top_border_px, view_width, view_height)
+        self.camera = [0, 0]
+        self.dragging = False
+        self.clamp_camera()
+
+        self.HEIGHT = view_height + self.bottom_border_px + self.top_border_px
+        self.WIDTH = view_width + self.vertical_border_px * 2
 
         self.game_running = False
-        self.in_game_time = 0
+        self.in_game_time = in_game_time
 
         # pygame settings
         Scene.screen = pygame.display.set_mode(size = (self.WIDTH, self.HEIGHT))
@@ -343,16 +505,62 @@ class Game(Scene):
         # initialize background and sprite elements
         self.init_bg()
         self.init_sprites()
-        self.font = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 24)
+        self.font_size = 24
 
         # initialize game
-        self.game = Minesweeper(dim_x, dim_y, num_mines)
+        self.hint = None # ((x, y), is_mine) highlighted until the next click
+        self.hover = None # (x, y) of the cell under the mouse
+        self.first_reveal = None # the only cell the first reveal is accepted on, if any
+        if board is not None:
+            # resume an existing board, e.g. from a save file
+            self.game = board
+            self.game_running = board.getEmptyTiles() > 0
+        elif no_guess:
+            self.init_no_guess_game()
+        else:
+            # mines are placed on the first click so it is never a mine
+            self.game = Minesweeper(dim_x, dim_y, num_mines, first_click_safe = True)
+        self.solver = Solver(self.game)
+
+        # mine probability heat map, toggled with P. it is recomputed in the background after each change
+        self.probabilities = ProbabilityEngine(self.game)
+        self.show_probabilities = False
+        self.game.subscribe(self.on_board_change)
+
+        # numbers and creepers never change once mines are placed, so they are drawn once into this layer
+        self.under_layer = None
+        self.under_layer_camera = None
+
+        # only regions that changed are redrawn. the drawn_ values are what is on screen right now
+        self.full_redraw = True
+        self.dirty = []
+        self.drawn_hint = None
+        self.drawn_hover = None
+        self.drawn_music = None
+        self.drawn_heat_map = None
+        self.info_values = None
+
+        # record inputs so the game can be replayed. resumed boards can't be rebuilt from their seed
+        self.recorder = Recorder(self.game) if board is None else None
+
+    def init_no_guess_game(self):
+        # guess-free boards are verified from a fixed first click, which is outlined as a hint
+        first_click = (self.dim_x // 2, self.dim_y // 2)
+        seed = self.board_generator.take(self.dim_x, self.dim_y, self.num_mines, first_click)
+        self.game = buildBoard(self.dim_x, self.dim_y, self.num_mines, seed, first_click)
+        self.hint = (first_click, False)
+
+        # the mines are already placed around that cell, so the game has to start there
+        self.first_reveal = first_click
+
+        # replace the used board in the background so the next game starts instantly
+        self.board_generator.refill(self.dim_x, self.dim_y, self.num_mines, first_click)
 
     def init_bg(self):
         # borders
-        top_border = pygame.image.load('resources/graphics/game/top_border.png').convert()
-        bottom_border = pygame.image.load('resources/graphics/game/bottom_border.png').convert()
-        vertical_border = pygame.image.load('resources/graphics/game/vertical_border.png').convert()
+        top_border = self.assets.image('resources/graphics/game/top_border.png')
+        bottom_border = self.assets.image('resources/graphics/game/bottom_border.png')
+        vertical_border = self.assets.image('resources/graphics/game/vertical_border.png')
 
         top_border_rect = top_border.get_rect()
         bottom_border_rect = bottom_border.get_rect()
@@ -365,16 +573,16 @@ class Game(Scene):
         left_border_rect.topright = (self.WIDTH, 0)
 
         # title
-        title_text = pygame.image.load('resources/graphics/game/title.png').convert_alpha()
+        title_text = self.assets.image('resources/graphics/game/title.png', alpha = True)
         title_text_rect = title_text.get_rect()
         title_text_rect.midtop = (self.WIDTH//2, self.top_border_px - 100)
 
-        info_bar = pygame.image.load('resources/graphics/game/info_bar.png').convert_alpha()
+        info_bar = self.assets.image('resources/graphics/game/info_bar.png', alpha = True)
         info_bar_rect = info_bar.get_rect()
-        info_bar_rect.center = (self.WIDTH//2, self.HEIGHT - self.ppg)
+        info_bar_rect.center = (self.WIDTH//2, self.HEIGHT - self.bottom_border_px//2)
 
-        menu_icon = pygame.image.load('resources/graphics/game/menu_icon.png').convert_alpha()
-        disc = pygame.image.load('resources/graphics/game/disc.png').convert_alpha()
+        menu_icon = self.assets.image('resources/graphics/game/menu_icon.png', alpha = True)
+        disc = self.assets.image('resources/graphics/game/disc.png', alpha = True)
 
         # save infobar rects to class so later we can handle collisions
         self.menu_icon_rect = menu_icon.get_rect()
@@ -398,50 +606,62 @@ class Game(Scene):
                     (disc, self.disc_rect)]
 
     def init_sprites(self):
-        mine = pygame.image.load('resources/graphics/game/mine.png').convert_alpha()
-        tile = pygame.image.load('resources/graphics/game/tile.png').convert()
-        flag = pygame.image.load('resources/graphics/game/flag.png').convert_alpha()
-
-        mine = pygame.transform.scale(mine, (self.ppg, self.ppg))
-        tile = pygame.transform.scale(tile, (self.ppg, self.ppg))
-        flag = pygame.transform.scale(flag, (self.ppg, self.ppg))
-
-        self.mine_rect = pygame.Surface.get_rect(mine)
-        self.tile_rect = pygame.Surface.get_rect(tile)
-        self.flag_rect = pygame.Surface.get_rect(flag)
+        size = (self.ppg, self.ppg)
+        mine = self.assets.image('resources/graphics/game/mine.png', size, alpha = True)
+        tile = self.assets.image('resources/graphics/game/tile.png', size)
+        flag = self.assets.image('resources/graphics/game/flag.png', size, alpha = True)
 
         self.mine = mine
         self.tile = tile
         self.flag = flag
+        self.heat = pygame.Surface((self.ppg, self.ppg), pygame.SRCALPHA)
+        self.highlight = pygame.Surface((self.ppg, self.ppg), pygame.SRCALPHA)
+        self.highlight.fill((255, 255, 255, 40))
 
-        self.no_music = pygame.image.load('resources/graphics/game/no_music.png').convert_alpha()
+        self.no_music = self.assets.image('resources/graphics/game/no_music.png', alpha = True)
         self.no_music_rect = self.no_music.get_rect()
         self.no_music_rect.center = self.disc_rect.center
 
     def handle(self, event):
         if event.type == pygame.USEREVENT + 0 and self.game_running:
             self.in_game_time += 1
+            self.record(TICK)
+
+        if event.type == pygame.MOUSEMOTION:
+            if self.dragging:
+                self.pan(-event.rel[0], -event.rel[1])
+            self.hover = self.cell_at(event.pos)
+
+        # middle mouse drags the board, the wheel zooms around the mouse and arrow keys scroll
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 2:
+            self.dragging = True
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+            self.dragging = False
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(event.y, pygame.mouse.get_pos())
+        if event.type == pygame.KEYDOWN and event.key in self.pan_keys:
+            dx, dy = self.pan_keys[event.key]
+            self.pan(dx * 3 * self.ppg, dy * 3 * self.ppg)
+
+        # the outlined first cell of a guess-free board stays until it is revealed
+        if event.type == pygame.MOUSEBUTTONDOWN and not self.first_reveal:
+            self.hint = None
 
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1: # left click interactions
             mouse_pos = event.pos
 
             # tile collision
-            for xy in self.game.getTilesXY():
-                # temporarily sets tile rect to existing tile
-                self.tile_rect.topleft = self.getPXY(xy)
-
-                if self.tile_rect.collidepoint(mouse_pos) and xy not in self.game.getFlagsXY():
-                    self.mine_click.play()
-
-                    while xy in self.game.getMinesXY() and not self.game_running: # new board if first move is a mine
-                        self.game = Minesweeper(self.dim_x, self.dim_y, self.num_mines)
-                    self.game_running = True
-                    x,y = xy
-                    self.game.removeAdjacentTiles(x, y) # removes blank spaces
-                    try: # removes single tile that covers a number square
-                        self.game.removeTile(x, y) 
-                    except ValueError:
-                        pass
+            xy = self.cell_at(mouse_pos)
+            if (xy and self.game.isCovered(*xy) and not self.game.isFlag(*xy)
+                    and self.first_reveal in (None, xy)):
+                self.mine_click.play()
+
+                self.game_running = True
+                self.first_reveal = None
+                self.hint = None
+                x,y = xy
+                self.game.reveal(x, y)
+                self.record(REVEAL, x, y)
 
             # music toggle
             if self.disc_rect.collidepoint(mouse_pos):
@@ -460,92 +680,324 @@ class Game(Scene):
             mouse_pos = event.pos
 
             # flag placement
-            for xy in self.game.getTilesXY():
-                self.tile_rect.topleft = self.getPXY(xy)
-
-                if self.tile_rect.collidepoint(mouse_pos) and self.game_running:
-                    self.torch_click.play()
+            xy = self.cell_at(mouse_pos)
+            if xy and self.game.isCovered(*xy) and self.game_running:
+                self.torch_click.play()
 
-                    x,y = xy
-                    if xy in self.game.getFlagsXY():
-                        self.game.removeFlag(x, y)
-                    else:
-                        self.game.addFlag(x, y)
+                x,y = xy
+                self.game.toggleFlag(x, y)
+                self.record(FLAG, x, y)
 
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 return Game_menu()
+            if event.key == pygame.K_h and self.game_running:
+                # only the numbers in view are read, a whole big board would stall the game
+                self.hint = self.solver.hint(self.view_cells())
+            if event.key == pygame.K_p:
+                self.show_probabilities = not self.show_probabilities
+                if self.show_probabilities:
+                    self.probabilities.request()
+
+            # quick save and quick load
+            if event.key == pygame.K_F5:
+                self.button_click.play()
+                savegame.save(self.game, in_game_time = self.in_game_time)
+            if event.key == pygame.K_F9:
+                try:
+                    board, in_game_time = savegame.load()
+                except (OSError, savegame.SaveFormatError):
+                    return
+                self.button_click.play()
+                self.leave()
+                self.clearScene()
+                return Game(board.dim_x, board.dim_y, board.num_mines, self.no_guess, board, in_game_time)
 
     def update(self):
-        if self.game.isWin():
+        status = self.game.status
+        if status != GameStatus.PLAYING:
+            self.leave()
+
+        if status == GameStatus.WON:
             return Game_isWin()
-        if self.game.isLoss():
+        if status == GameStatus.LOST:
             return Game_isLoss_transition()
 
-    def draw(self):
-        self.screen.fill(pygame.Color(50,50,50))
-        self.screen.blits(self.bg)
+    pan_keys = {pygame.K_LEFT: (-1, 0),
+                pygame.K_RIGHT: (1, 0),
+                pygame.K_UP: (0, -1),
+                pygame.K_DOWN: (0, 1)}
+
+    def pan(self, dx, dy):
+        old = tuple(self.camera)
+        self.camera[0] += dx
+        self.camera[1] += dy
+        self.clamp_camera()
+        if tuple(self.camera) != old:
+            self.mark_dirty(self.view_rect)
+
+    def zoom(self, steps, pixel):
+        i = self.zoom_levels.index(self.ppg)
+        ppg = self.zoom_levels[max(0, min(len(self.zoom_levels) - 1, i + steps))]
+        if ppg == self.ppg:
+            return
+
+        # keep the board point under the mouse in place, or the view's center when the mouse is elsewhere
+        anchor = pixel if self.view_rect.collidepoint(pixel) else self.view_rect.center
+        for axis, offset in enumerate(self.view_rect.topleft):
+            board_px = anchor[axis] - offset + self.camera[axis]
+            self.camera[axis] = board_px * ppg // self.ppg - (anchor[axis] - offset)
+        self.ppg = ppg
+        self.clamp_camera()
 
-        if not self.music:
-            self.screen.blit(self.no_music, self.no_music_rect)
+        self.init_sprites()
+        self.hover = self.cell_at(pixel)
+        self.mark_dirty(self.view_rect)
+
+    def clamp_camera(self):
+        '''keeps the board inside the view, centered on any axis where it is smaller than the view'''
+        for axis, (cells, view) in enumerate(((self.dim_x, self.view_rect.width), (self.dim_y, self.view_rect.height))):
+            board = cells * self.ppg
+            if board <= view:
+                self.camera[axis] = -((view - board) // 2)
+            else:
+                self.camera[axis] = max(0, min(board - view, self.camera[axis]))
+
+    def record(self, kind, x = 0, y = 0):
+        if self.recorder:
+            self.recorder.record(kind, x, y)
+
+    def leave(self):
+        # unfinished games are saved too, they are the ones worth replaying. untouched boards aren't
+        if self.recorder and self.recorder.events:
+            self.recorder.save()
+        self.recorder = None
+
+    def on_board_change(self, changes):
+        if changes.full_refresh or changes.generated:
+            self.under_layer = None
+            self.invalidate()
+        else:
+            self.mark_cells_dirty(changes.revealed | changes.covered | changes.flagged | changes.unflagged)
 
-        # draws number of mines in adjacent cells
-        for i, row in enumerate(self.game.getNeighbors_field()):
-            for j, val in enumerate(row):
-                if val == 0:
-                    continue
+        if self.show_probabilities and changes.status == GameStatus.PLAYING:
+            self.probabilities.request()
 
-                neighbor_text = self.font.render(str(val), False, 'white')
+    def invalidate(self):
+        self.full_redraw = True
 
-                xy = (j, i)
-                xy = self.getPXY(xy) # convert grid coordinates to pixel
-                x, y = xy
+    def changed(self):
+        self.find_changes()
+        return self.full_redraw or bool(self.dirty)
 
-                font_rect = neighbor_text.get_rect()
-                font_rect.center = x + self.ppg//2, y + self.ppg//2
+    def idle(self):
+        # a heat map being computed, or one finished but not drawn yet, shows up without an event
+        return not self.probabilities.busy and not self.changed()
 
-                self.screen.blit(neighbor_text, font_rect)
+    def mark_dirty(self, rect):
+        self.dirty.append(pygame.Rect(rect))
 
-        # draws corresponding game elements
-        for xy in self.game.getMinesXY():
-            self.mine_rect.topleft = self.getPXY(xy)
-            self.screen.blit(self.mine, self.mine_rect)
+    def mark_cells_dirty(self, cells):
+        # a big flood reveal is cheaper to redraw as one region than cell by cell
+        if len(cells) > 64:
+            xs = [x for x, _ in cells]
+            ys = [y for _, y in cells]
+            rects = [self.cell_rect((min(xs), min(ys))).union(self.cell_rect((max(xs), max(ys))))]
+        else:
+            rects = [self.cell_rect(xy) for xy in cells]
+
+        # cells scrolled out of view don't need drawing
+        for rect in rects:
+            rect = rect.clip(self.view_rect)
+            if rect:
+                self.dirty.append(rect)
 
-        for xy in self.game.getTilesXY():
-            self.tile_rect.topleft = self.getPXY(xy)
-            self.screen.blit(self.tile, self.tile_rect)
+    def draw(self):
+        self.find_changes()
+
+        if self.full_redraw:
+            self.full_redraw = False
+            self.dirty = []
+            self.draw_region(self.screen.get_rect())
+            return None
+
+        dirty = self.dirty
+        self.dirty = []
+        for rect in dirty:
+            self.draw_region(rect)
+        return dirty
+
+    def find_changes(self):
+        '''marks what changed outside the board since the last frame'''
+        if self.hint != self.drawn_hint:
+            for hint in (self.hint, self.drawn_hint):
+                if hint:
+                    self.mark_dirty(self.cell_rect(hint[0]))
+            self.drawn_hint = self.hint
+
+        if self.hover != self.drawn_hover:
+            for xy in (self.hover, self.drawn_hover):
+                if xy:
+                    self.mark_dirty(self.cell_rect(xy))
+            self.drawn_hover = self.hover
+
+        if self.music != self.drawn_music:
+            self.mark_dirty(self.disc_rect)
+            self.drawn_music = self.music
+
+        # the heat map changes when it is toggled or the worker finishes a new result
+        heat_map = self.probabilities.result if self.show_probabilities else None
+        if heat_map is not self.drawn_heat_map:
+            self.mark_dirty(self.board_rect())
+            self.drawn_heat_map = heat_map
+
+        values = self.info_bar_values()
+        if values != self.info_values:
+            if self.info_values is not None:
+                self.dirty.extend(rect for _, rect in self.info_texts)
+            self.info_values = values
+            self.render_info_bar_texts(values)
+            self.dirty.extend(rect for _, rect in self.info_texts)
+
+    def draw_region(self, rect):
+        '''redraws everything inside rect'''
+        self.screen.set_clip(rect)
+        self.screen.fill(pygame.Color(50,50,50))
+        self.screen.blits(self.bg)
+
+        if not self.music:
+            self.screen.blit(self.no_music, self.no_music_rect)
 
-        for xy in self.game.getFlagsXY():
-            if xy not in self.game.getTilesXY():
-                continue
-            self.flag_rect.topleft = self.getPXY(xy)
-            self.screen.blit(self.flag, self.flag_rect)
+        # the board is clipped to the view, and only the cells overlapping rect are visited
+        board = rect.clip(self.view_rect)
+        if board:
+            self.screen.set_clip(board)
+            camera = (tuple(self.camera), self.ppg)
+            if self.under_layer is None or self.under_layer_camera != camera:
+                self.under_layer = self.render_under_layer()
+                self.under_layer_camera = camera
+            self.screen.blit(self.under_layer, self.view_rect)
+
+            probabilities = None
+            if self.show_probabilities and self.probabilities.result:
+                probabilities, _ = self.probabilities.result
+            for x, y in self.cells_in(board):
+                self.draw_cell(x, y, probabilities)
+
+            # outline hinted cell. green is safe to mine, red needs a torch
+            if self.hint:
+                xy, is_mine = self.hint
+                color = 'red' if is_mine else 'green'
+                pygame.draw.rect(self.screen, color, self.cell_rect(xy), 2)
+            self.screen.set_clip(rect)
 
-        self.render_info_bar_texts()
         self.screen.blits(self.info_texts)
+        self.screen.set_clip(None)
+
+    def draw_cell(self, x, y, probabilities = None):
+        # revealed cells show the under layer
+        if not self.game.isCovered(x, y):
+            return
+
+        pxy = self.getPXY((x, y))
+        self.screen.blit(self.tile, pxy)
+        if (x, y) == self.hover:
+            self.screen.blit(self.highlight, pxy)
+        if self.game.isFlag(x, y):
+            self.screen.blit(self.flag, pxy)
+        elif probabilities and (x, y) in probabilities:
+            # shades covered blocks from green to red by mine probability
+            p = probabilities[(x, y)]
+            self.heat.fill((int(255 * p), int(255 * (1 - p)), 0, 110))
+            self.screen.blit(self.heat, pxy)
+
+    def render_under_layer(self):
+        '''draws the number of mines in adjacent cells and every creeper in view onto a transparent view sized surface.
+        redrawn only when mines are placed or the camera moves'''
+        layer = pygame.Surface(self.view_rect.size, pygame.SRCALPHA)
+        glyphs = self.get_digit_glyphs()
+        left, top = self.view_rect.topleft
+
+        for x, y in self.cells_in(self.view_rect):
+            px, py = self.getPXY((x, y))
+            px -= left
+            py -= top
+
+            val = self.game.getNeighbors(x, y)
+            if val:
+                font_rect = glyphs[val].get_rect()
+                font_rect.center = px + self.ppg//2, py + self.ppg//2
+                layer.blit(glyphs[val], font_rect)
+            if self.game.isMine(x, y):
+                layer.blit(self.mine, (px, py))
+
+        return layer
+
+    def get_digit_glyphs(self):
+        # digits scale with the zoom, 24 at the default 30 pixel cells
+        size = self.ppg * 4 // 5
+        if size not in self.digit_glyphs:
+            self.digit_glyphs[size] = {val: self.render_text(REGULAR_FONT, size, val) for val in range(1, 9)}
+        return self.digit_glyphs[size]
 
     # draw() helper functions
     def getPXY(self, coordinates: tuple):
         '''draw helper function to convert from minesweeper grid to pixel coordinates'''
         x, y = coordinates
-        x = x * self.ppg + self.vertical_border_px
-        y = y * self.ppg + self.top_border_px
+        x = x * self.ppg - self.camera[0] + self.vertical_border_px
+        y = y * self.ppg - self.camera[1] + self.top_border_px
 
         return (x, y)
-    
-    def render_info_bar_texts(self):
-        texts_to_render = [self.game.getFlagsRemaining(),
-                            self.game.getEmptyTiles(),
-                            self.game.getMines(),
-                            self.in_game_time]
-
-        rendered_texts = []
-        for text in texts_to_render:
-            render = self.font.render(str(text), False, 'white')
-            rendered_texts.append(render)
 
-        rendered_texts = list(map(lambda text: pygame.transform.rotozoom(text, 0, 0.8),
-                                 rendered_texts))
+    def getXY(self, pixel: tuple):
+        '''inverse of getPXY, the grid cell under a pixel. may be outside the board'''
+        x, y = pixel
+        return ((x - self.vertical_border_px + self.camera[0]) // self.ppg,
+                (y - self.top_border_px + self.camera[1]) // self.ppg)
+
+    def cell_at(self, pixel: tuple):
+        '''returns the (x, y) cell under a pixel, or None over the borders'''
+        if not self.view_rect.collidepoint(pixel):
+            return None
+        x, y = self.getXY(pixel)
+        if 0 <= x < self.dim_x and 0 <= y < self.dim_y:
+            return (x, y)
+        return None
+
+    def cells_in(self, rect):
+        '''yields the board cells overlapping a screen rect'''
+        x0, y0 = self.getXY(rect.topleft)
+        x1, y1 = self.getXY((rect.right - 1, rect.bottom - 1))
+        for y in range(max(0, y0), min(self.dim_y, y1 + 1)):
+            for x in range(max(0, x0), min(self.dim_x, x1 + 1)):
+                yield (x, y)
+
+    def view_cells(self):
+        '''returns the (x0, y0, x1, y1) box of cells in view, x1 and y1 excluded,
+        or None if the whole board fits in the view'''
+        x0, y0 = self.getXY(self.view_rect.topleft)
+        x1, y1 = self.getXY((self.view_rect.right - 1, self.view_rect.bottom - 1))
+        box = (max(0, x0), max(0, y0), min(self.dim_x, x1 + 1), min(self.dim_y, y1 + 1))
+        return None if box == (0, 0, self.dim_x, self.dim_y) else box
+
+    def cell_rect(self, xy):
+        return pygame.Rect(self.getPXY(xy), (self.ppg, self.ppg))
+
+    def board_rect(self):
+        board = pygame.Rect(self.getPXY((0, 0)), (self.ppg * self.dim_x, self.ppg * self.dim_y))
+        return board.clip(self.view_rect)
+
+    def info_bar_values(self):
+        return (self.game.getFlagsRemaining(),
+                self.game.getEmptyTiles(),
+                self.game.getMines(),
+                self.in_game_time)
+
+    def render_info_bar_texts(self, texts_to_render):
+        # counts on big boards are shrunk to fit their inventory slot
+        rendered_texts = [self.render_text(REGULAR_FONT, self.font_size, text,
+                                           scale = 0.8 * min(1, 3 / len(str(text))))
+                          for text in texts_to_render]
 
         rendered_texts_rects = [text.get_rect() for text in rendered_texts]
 
@@ -559,383 +1011,199 @@ class Game(Scene):
 
         self.info_texts = list(zip(rendered_texts, rendered_texts_rects))
 
-class Game_menu(Scene):
-    def __init__(self):
-        super().__init__()
-
-        # pause music
-        self.music = False
-
-        self.WIDTH = self.getPrevScene().WIDTH
-        self.HEIGHT = self.getPrevScene().HEIGHT
-
-        self.init_bg()
-        self.init_buttons()
-
-    def init_bg(self):
-        self.bg = pygame.Surface((self.WIDTH, self.HEIGHT))
-        self.bg.fill('black')
-        self.bg.set_alpha(75) # transparency
-
-        self.font_small = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 16)
-        self.font_large = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 32)
-
-        self.death_text = self.font_large.render('Game Paused', False, 'white')
-        self.death_text_rect = self.death_text.get_rect()
-
-        time_elapsed = self.getPrevScene().in_game_time
-        self.score_text = self.font_small.render(f'Time: {time_elapsed}', False, 'white')
-        self.score_text_rect = self.score_text.get_rect()
-
-    def init_buttons(self):
-        button_texts = ['Resume',
-                        'New Game',
-                        'Title Screen']
-
-        # load and scale button according to window width
-        self.button = pygame.image.load('resources/graphics/global/menu_button_unselected.png').convert()
-        vertical_border_px = self.getPrevScene().vertical_border_px
-        button_width = min(400, self.WIDTH - 2 * vertical_border_px)
-        self.button = pygame.transform.smoothscale(self.button, (button_width, 47))
-        self.button_rect = self.button.get_rect(midtop = (self.WIDTH // 2, 200))
-
-        self.button_selected = pygame.image.load('resources/graphics/global/menu_button_selected.png').convert()
-        self.button_selected = pygame.transform.smoothscale(self.button_selected, (button_width, 47))
-
-        # list of buttons and their rects
-        self.buttons = [[self.button.copy(), self.button_rect.copy()] for i in range(len(button_texts))]
-
-        # load font
-        font = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 24)
-
-        # space the buttons
-        for i, button in enumerate(self.buttons):
-            button[1].top += 60 * i
+class Game_replay(Game):
+    '''plays back a recorded game. keys 1 to 5 set the speed from 1x to 16x'''
+    speed_keys = {pygame.K_1: 1,
+                  pygame.K_2: 2,
+                  pygame.K_3: 4,
+                  pygame.K_4: 8,
+                  pygame.K_5: 16}
 
-        # create text renders
-        button_texts_surfs = [font.render(text, False, 'white') for text in button_texts]
-        button_texts_rects = [surf.get_rect() for surf in button_texts_surfs]
+    def __init__(self, replay, speed = 1):
+        super().__init__(replay.dim_x, replay.dim_y, replay.num_mines, board = replay.newBoard())
 
-        # center text to according button rects
-        for i, rect in enumerate(button_texts_rects):
-            rect.center = self.buttons[i][1].center
-            rect.centery -= 2 # needed to offset a little
+        self.replay = replay
+        self.speed = speed
+        self.replay_time = 0 # milliseconds of the recording played so far
+        self.next_event = 0
 
-        self.button_texts = list(zip(button_texts_surfs, button_texts_rects))
-
-        # button dictionary where key is its text / for easy object lookup
-        self.button_dict = {}
-        for i, text in enumerate(button_texts):
-            self.button_dict[text] = self.buttons[i]
+        # room for the widest speed label, so changing speed only redraws this rect
+        font = self.assets.font(REGULAR_FONT, self.font_size)
+        self.speed_rect = pygame.Rect((self.vertical_border_px, 5), font.size('Replay 16x'))
 
     def handle(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                xy = pygame.mouse.get_pos()
-                if self.buttons[0][1].collidepoint(xy):
-                    self.button_click.play()
-                    return self.returnToPrev()
-
-                if self.buttons[1][1].collidepoint(xy):
-                    # get parameters of previous game
-                    dim_x = self.getPrevScene().dim_x
-                    dim_y = self.getPrevScene().dim_y
-                    num_mines = self.getPrevScene().num_mines
-
-                    self.button_click.play()
-                    self.clearScene()
-                    return Game(dim_x, dim_y, num_mines)
-
-                if self.buttons[2][1].collidepoint(xy):
-                    self.button_click.play()
-                    self.clearScene()
-                    return MainMenu()
-
+        # the board only takes input from the recording
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
-                return self.returnToPrev()
+                self.clearScene()
+                return MainMenu()
+            if event.key in self.speed_keys:
+                self.speed = self.speed_keys[event.key]
+                self.mark_dirty(self.speed_rect)
+
+    def idle(self):
+        return False
 
     def update(self):
-        # button selection highlighting
-        for button in self.buttons:
-            if button[1].collidepoint(pygame.mouse.get_pos()):
-                button[0] = self.button_selected.copy()
-            else:
-                button[0] = self.button.copy()
+        self.replay_time += self.clock.get_time() * self.speed
 
-    def draw(self):
-        self.drawPrevScene()
-        self.screen.blit(self.bg, (0,0))
+        events = self.replay.events
+        while self.next_event < len(events) and events[self.next_event][1] <= self.replay_time:
+            self.in_game_time += self.replay.apply(self.game, events[self.next_event])
+            self.next_event += 1
 
-        # position text
-        self.death_text_rect.midtop = (self.WIDTH//2, 85)
-        self.score_text_rect.midtop = (self.WIDTH//2, 125)
-        self.screen.blit(self.death_text, self.death_text_rect)
-        self.screen.blit(self.score_text, self.score_text_rect)
+        return super().update()
 
-        self.screen.blits(blit_sequence = self.buttons)
-        self.screen.blits(blit_sequence = self.button_texts)
+    def draw_region(self, rect):
+        super().draw_region(rect)
 
-class Game_isWin(Scene):
-    def __init__(self):
+        if rect.colliderect(self.speed_rect):
+            speed_text = self.render_text(REGULAR_FONT, self.font_size, f'Replay {self.speed}x')
+            self.screen.set_clip(rect)
+            self.screen.blit(speed_text, self.speed_rect)
+            self.screen.set_clip(None)
+
+class Overlay(Scene):
+    '''menu drawn over the game underneath, dimmed with a translucent tint.
+    labels are the (text, callback) pairs of its buttons'''
+
+    def __init__(self, tint, title, labels):
         super().__init__()
 
         self.WIDTH = self.getPrevScene().WIDTH
         self.HEIGHT = self.getPrevScene().HEIGHT
 
-        self.init_bg()
-        self.init_buttons()
+        self.init_bg(tint, title)
+        self.init_buttons(labels)
 
-    def init_bg(self):
+    def subtitle(self):
+        return f'Time: {self.getPrevScene().in_game_time}'
+
+    def init_bg(self, tint, title):
         self.bg = pygame.Surface((self.WIDTH, self.HEIGHT))
-        self.bg.fill('black')
+        self.bg.fill(tint)
         self.bg.set_alpha(75) # transparency
 
-        self.font_small = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 16)
-        self.font_large = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 32)
+        self.title_text = self.render_text(REGULAR_FONT, 32, title)
+        self.title_text_rect = self.title_text.get_rect(midtop = (self.WIDTH//2, 85))
 
-        self.death_text = self.font_large.render('You Won!', False, 'white')
-        self.death_text_rect = self.death_text.get_rect()
-
-        time_elapsed = self.getPrevScene().in_game_time
-        self.score_text = self.font_small.render(f'Time: {time_elapsed}', False, 'white')
-        self.score_text_rect = self.score_text.get_rect()
-
-    def init_buttons(self):
-        button_texts = ['New Game',
-                        'Title Screen']
+        self.subtitle_text = self.render_text(REGULAR_FONT, 16, self.subtitle())
+        self.subtitle_text_rect = self.subtitle_text.get_rect(midtop = (self.WIDTH//2, 125))
 
-        # load and scale button according to window width
-        self.button = pygame.image.load('resources/graphics/global/menu_button_unselected.png').convert()
+    def init_buttons(self, labels):
+        # scale buttons according to window width
         vertical_border_px = self.getPrevScene().vertical_border_px
         button_width = min(400, self.WIDTH - 2 * vertical_border_px)
-        self.button = pygame.transform.smoothscale(self.button, (button_width, 47))
-        self.button_rect = self.button.get_rect(midtop = (self.WIDTH // 2, 200))
-
-        self.button_selected = pygame.image.load('resources/graphics/global/menu_button_selected.png').convert()
-        self.button_selected = pygame.transform.smoothscale(self.button_selected, (button_width, 47))
-
-        # list of buttons and their rects
-        self.buttons = [[self.button.copy(), self.button_rect.copy()] for i in range(len(button_texts))]
-
-        # load font
-        font = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 24)
-
-        # space the buttons
-        for i, button in enumerate(self.buttons):
-            button[1].top += 60 * i
-
-        # create text renders
-        button_texts_surfs = [font.render(text, False, 'white') for text in button_texts]
-        button_texts_rects = [surf.get_rect() for surf in button_texts_surfs]
-
-        # center text to according button rects
-        for i, rect in enumerate(button_texts_rects):
-            rect.center = self.buttons[i][1].center
-            rect.centery -= 2 # needed to offset a little
-
-        self.button_texts = list(zip(button_texts_surfs, button_texts_rects))
-
-        # button dictionary where key is its text / for easy object lookup
-        self.button_dict = {}
-        for i, text in enumerate(button_texts):
-            self.button_dict[text] = self.buttons[i]
+        self.buttons = self.make_buttons(labels, (button_width, 47), midtop = (self.WIDTH // 2, 200))
 
     def handle(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
                 xy = pygame.mouse.get_pos()
-                if self.buttons[0][1].collidepoint(xy):
-                    # get parameters of previous game
-                    dim_x = self.getPrevScene().dim_x
-                    dim_y = self.getPrevScene().dim_y
-                    num_mines = self.getPrevScene().num_mines
-
-                    self.button_click.play()
-                    self.clearScene()
-                    return Game(dim_x, dim_y, num_mines)
-
-                if self.buttons[1][1].collidepoint(xy):
-                    self.button_click.play()
-                    self.clearScene()
-                    return MainMenu()
+                return self.click_buttons(xy)
 
     def update(self):
         # button selection highlighting
-        for button in self.buttons:
-            if button[1].collidepoint(pygame.mouse.get_pos()):
-                button[0] = self.button_selected.copy()
-            else:
-                button[0] = self.button.copy()
+        self.update_buttons()
 
     def draw(self):
-        self.drawPrevScene()
-        self.screen.blit(self.bg, (0,0))
+        # the game underneath is static, so it is drawn once with the tint and text baked in
+        self.drawBackdrop((self.bg, (0,0)),
+                          (self.title_text, self.title_text_rect),
+                          (self.subtitle_text, self.subtitle_text_rect))
+        self.draw_buttons()
+
+class Game_menu(Overlay):
+    def __init__(self):
+        super().__init__('black', 'Game Paused', [('Resume', self.returnToPrev),
+                                                  ('New Game', self.newGame),
+                                                  ('Title Screen', self.titleScreen)])
+
+        # pause music
+        self.music = False
+
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return self.returnToPrev()
 
-        # position text
-        self.death_text_rect.midtop = (self.WIDTH//2, 85)
-        self.score_text_rect.midtop = (self.WIDTH//2, 125)
-        self.screen.blit(self.death_text, self.death_text_rect)
-        self.screen.blit(self.score_text, self.score_text_rect)
+        return super().handle(event)
 
-        self.screen.blits(blit_sequence = self.buttons)
-        self.screen.blits(blit_sequence = self.button_texts)
+class Game_isWin(Overlay):
+    def __init__(self):
+        super().__init__('black', 'You Won!', [('New Game', self.newGame),
+                                               ('Title Screen', self.titleScreen)])
 
 class Game_isLoss_transition(Scene):
+    duration = 1500 # milliseconds to reveal every creeper, however many there are
+
     def __init__(self):
         super().__init__()
 
         self.game = self.getPrevScene().game
-        self.minesXY = self.game.getMinesXY()[:]
-        self.ticks = 0
+        self.minesXY = [xy for xy in self.game.getMinesXY() if self.game.isCovered(*xy)]
+        self.num_revealed = 0
+        self.tween = Tween(self.duration)
+
+    def invalidate(self):
+        self.getPrevScene().invalidate()
 
-        # set animation proportional to number of mines
-        self.num_mines = self.game.getMines()
-        self.max_tick = 1500 // self.num_mines
+    def idle(self):
+        return False
 
     def update(self):
-        if not self.minesXY:
+        if self.tween.done:
             self.replacePrevScene()
             return Game_isLoss()
-            
-        # timer for revealing mines
-        self.ticks += self.clock.get_time()
+
+        # reveal as many creepers as the elapsed time calls for, so big boards don't take longer
+        progress = self.tween.advance(self.clock.get_time())
+        target = min(len(self.minesXY), math.ceil(progress * len(self.minesXY)))
+        for x, y in self.minesXY[self.num_revealed:target]:
+            self.game.removeTile(x, y)
+        self.num_revealed = target
 
     def draw(self):
-        self.drawPrevScene()
-        pygame.display.flip()
+        # the game scene redraws just the revealed creepers
+        return self.getPrevScene().draw()
 
-        if self.ticks > self.max_tick:
-            mineXY = self.minesXY.pop()
-            x,y = mineXY
-            try:
-                self.game.removeTile(x,y)
-            except ValueError:
-                pass
-            self.drawPrevScene()
-            pygame.display.flip()
-            self.ticks = 0
-            
-class Game_isLoss(Scene):
+class Game_isLoss(Overlay):
     def __init__(self):
-        super().__init__()
-
-        self.WIDTH = self.getPrevScene().WIDTH
-        self.HEIGHT = self.getPrevScene().HEIGHT
+        super().__init__(pygame.Color(255,0,0), 'You Died!', [('Respawn', self.newGame),
+                                                              ('Title Screen', self.titleScreen)])
 
-        self.init_bg()
-        self.init_buttons()
-
-    def init_bg(self):
-        self.bg = pygame.Surface((self.WIDTH, self.HEIGHT))
-        self.bg.fill(pygame.Color(255,0,0))
-        self.bg.set_alpha(75) # transparency
-
-        self.font_small = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 16)
-        self.font_large = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 32)
-
-        self.death_text = self.font_large.render('You Died!', False, 'white')
-        self.death_text_rect = self.death_text.get_rect()
-
-        flags_correct = self.getPrevScene().game.getFlagsCorrect()
-        self.score_text = self.font_small.render(f'Score: {flags_correct}', False, 'white')
-        self.score_text_rect = self.score_text.get_rect()
-
-    def init_buttons(self):
-        button_texts = ['Respawn',
-                        'Title Screen']
-
-        # load and scale button according to window width
-        self.button = pygame.image.load('resources/graphics/global/menu_button_unselected.png').convert()
-        vertical_border_px = self.getPrevScene().vertical_border_px
-        button_width = min(400, self.WIDTH - 2 * vertical_border_px)
-        self.button = pygame.transform.smoothscale(self.button, (button_width, 47))
-        self.button_rect = self.button.get_rect(midtop = (self.WIDTH // 2, 200))
+    def subtitle(self):
+        return f'Score: {self.getPrevScene().game.getFlagsCorrect()}'
 
-        self.button_selected = pygame.image.load('resources/graphics/global/menu_button_selected.png').convert()
-        self.button_selected = pygame.transform.smoothscale(self.button_selected, (button_width, 47))
+# longest sleep between frames while the scene is idle, in milliseconds
+IDLE_TIMEOUT = 1000
 
-        # list of buttons and their rects
-        self.buttons = [[self.button.copy(), self.button_rect.copy()] for i in range(len(button_texts))]
-
-        # load font
-        font = pygame.font.Font('resources/fonts/MinecraftRegular-Bmg3.otf', 24)
-
-        # space the buttons
-        for i, button in enumerate(self.buttons):
-            button[1].top += 60 * i
-
-        # create text renders
-        button_texts_surfs = [font.render(text, False, 'white') for text in button_texts]
-        button_texts_rects = [surf.get_rect() for surf in button_texts_surfs]
-
-        # center text to according button rects
-        for i, rect in enumerate(button_texts_rects):
-            rect.center = self.buttons[i][1].center
-            rect.centery -= 2 # needed to offset a little
-
-        self.button_texts = list(zip(button_texts_surfs, button_texts_rects))
-
-        # button dictionary where key is its text / for easy object lookup
-        self.button_dict = {}
-        for i, text in enumerate(button_texts):
-            self.button_dict[text] = self.buttons[i]
-
-    def handle(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                xy = pygame.mouse.get_pos()
-                if self.buttons[0][1].collidepoint(xy):
-                    # get parameters of previous game
-                    dim_x = self.getPrevScene().dim_x
-                    dim_y = self.getPrevScene().dim_y
-                    num_mines = self.getPrevScene().num_mines
-
-                    self.button_click.play()
-                    self.clearScene()
-                    return Game(dim_x, dim_y, num_mines)
-
-                if self.buttons[1][1].collidepoint(xy):
-                    self.button_click.play()
-                    self.clearScene()
-                    return MainMenu()
-
-    def update(self):
-        # button selection highlighting
-        for button in self.buttons:
-            if button[1].collidepoint(pygame.mouse.get_pos()):
-                button[0] = self.button_selected.copy()
-            else:
-                button[0] = self.button.copy()
-
-    def draw(self):
-        self.drawPrevScene()
-        self.screen.blit(self.bg, (0,0))
-
-        # position text
-        self.death_text_rect.midtop = (self.WIDTH//2, 85)
-        self.score_text_rect.midtop = (self.WIDTH//2, 125)
-        self.screen.blit(self.death_text, self.death_text_rect)
-        self.screen.blit(self.score_text, self.score_text_rect)
-
-        self.screen.blits(blit_sequence = self.buttons)
-        self.screen.blits(blit_sequence = self.button_texts)
+# the only events any scene handles. anything else would just wake the loop.
+# SDL fills in KEYDOWN.unicode from TEXTINPUT, so typing digits needs it too
+EVENT_TYPES = [pygame.QUIT, pygame.KEYDOWN, pygame.TEXTINPUT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+               pygame.MOUSEMOTION, pygame.MOUSEWHEEL, pygame.USEREVENT, pygame.WINDOWEXPOSED]
 
 def main():
     pygame.init()
     Scene.clock = pygame.time.Clock()
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(EVENT_TYPES)
     scene = MainMenu()
 
     # global music and sounds
     pygame.mixer.init()
     Scene.music = True
-    bg_music = pygame.mixer.Sound('resources/music/semi-calm.mp3')
+    bg_music = Scene.assets.sound('resources/music/semi-calm.mp3')
     bg_music.play(-1)
 
-    Scene.button_click = pygame.mixer.Sound('resources/sounds/click.wav')
-    Scene.mine_click = pygame.mixer.Sound('resources/sounds/mine.wav')
-    Scene.torch_click = pygame.mixer.Sound('resources/sounds/torch.wav')
-    
+    Scene.button_click = Scene.assets.sound('resources/sounds/click.wav')
+    Scene.mine_click = Scene.assets.sound('resources/sounds/mine.wav')
+    Scene.torch_click = Scene.assets.sound('resources/sounds/torch.wav')
+
+    # guess-free boards for the presets. refills run in worker processes so they don't hold up the game
+    Scene.board_generator = BoardGenerator(cache_size = 3)
+
+    drawn_scene = None
     while True:
         # global music control
         if scene.music:
@@ -943,14 +1211,35 @@ def main():
         else:
             bg_music.set_volume(0)
 
-        if pygame.event.get(pygame.QUIT):
-            pygame.quit()
-            quit()
-        for event in pygame.event.get():
+        # an idle scene sleeps until input, the game timer or the timeout. animations run at 60 fps
+        events = []
+        if scene.idle():
+            events.append(pygame.event.wait(IDLE_TIMEOUT))
+            # time spent asleep shouldn't count towards the next animation frame
+            Scene.clock = pygame.time.Clock()
+        events += pygame.event.get()
+
+        for event in events:
+            if event.type == pygame.QUIT:
+                for open_scene in scene.render_stack:
+                    open_scene.leave()
+                Scene.board_generator.close()
+                pygame.quit()
+                quit()
+            if event.type == pygame.WINDOWEXPOSED:
+                drawn_scene = None
             scene = scene.handle(event) or scene
         scene = scene.update() or scene
-        scene.draw()
-        pygame.display.flip()
+
+        # a new scene starts from a full redraw, after that scenes may report only what changed
+        if scene is not drawn_scene:
+            scene.invalidate()
+            drawn_scene = scene
+        dirty = scene.draw()
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
         scene.clock.tick(60)
 
 if __name__ == '__main__':
@@ -0,0 +1,165 @@
+'''benchmarks the Minesweeper engine across board sizes and mine densities.
+
+usage:
+    python benchmark.py                          run the full sweep and compare against the baseline
+    python benchmark.py --sizes 10 100 500       only run some board sizes
+    python benchmark.py --save-baseline          store this run as the new baseline
+
+results are written as JSON. each result is the median of several samples, and every sample repeats
+the benchmark until it has run for at least --min-time seconds. any benchmark slower than the baseline
+by more than --threshold is reported as a regression and the exit code is 1, as it is without a baseline.
+benchmarks whose timed call, e.g. a whole batch of flag toggles, is faster than --noise-floor
+are reported but never compared'''
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from minesweeper import Minesweeper
+
+BASELINE_PATH = 'benchmark_baseline.json'
+SIZES = [10, 50, 100, 500, 1000, 2000]
+DENSITIES = [0.05, 0.12, 0.2]
+
+def timeit(function, repeat, min_time, setup = None):
+    '''returns the median seconds per call over repeat samples. each sample calls function until
+    min_time seconds were spent in it, so short benchmarks aren't timed on a single call.
+    with setup, function is setup()'s result and only it is timed'''
+    samples = []
+    for _ in range(repeat):
+        calls = 0
+        elapsed = 0.0
+        while elapsed < min_time:
+            run = setup() if setup else function
+            start = time.perf_counter()
+            run()
+            elapsed += time.perf_counter() - start
+            calls += 1
+        samples.append(elapsed / calls)
+    return statistics.median(samples)
+
+def benchConstruction(size, density, repeat, min_time):
+    # random_mines and calcNeighbors_field both run inside the constructor
+    num_mines = int(size * size * density)
+    return timeit(lambda: Minesweeper(size, size, num_mines, seed = 0), repeat, min_time)
+
+def benchFlood(size, repeat, min_time):
+    # an empty board is the worst case, the flood reveals every cell. building it isn't timed
+    def setup():
+        game = Minesweeper(size, size, 0, seed = 0)
+        return lambda: game.removeAdjacentTiles(0, 0)
+
+    return timeit(None, repeat, min_time, setup)
+
+# the per call benchmarks return (seconds per batch, calls per batch)
+def benchFlags(size, density, repeat, min_time, toggles = 10000):
+    game = Minesweeper(size, size, int(size * size * density), seed = 0)
+    rng = random.Random(0)
+    cells = [(rng.randrange(size), rng.randrange(size)) for _ in range(toggles)]
+
+    def toggle():
+        for x, y in cells:
+            game.toggleFlag(x, y)
+
+    return timeit(toggle, repeat, min_time), toggles
+
+def benchStatus(size, density, repeat, min_time, calls = 10000):
+    game = Minesweeper(size, size, int(size * size * density), seed = 0)
+    game.removeAdjacentTiles(size // 2, size // 2)
+
+    def status():
+        for _ in range(calls):
+            game.isWin()
+            game.isLoss()
+
+    return timeit(status, repeat, min_time), calls
+
+def run(sizes, densities, repeat, min_time, out = sys.stderr):
+    results = []
+
+    def record(name, size, density, seconds, calls = 1):
+        # seconds is what one timed call took, the noise floor applies to it
+        results.append({'benchmark': name, 'size': size, 'density': density,
+                        'seconds': seconds / calls, 'sample_seconds': seconds})
+        out.write(f'{name:<14} {size:>5}x{size:<5} {density:>5.2f}  {seconds / calls * 1000:12.4f} ms\n')
+
+    for size in sizes:
+        for density in densities:
+            record('construction', size, density, benchConstruction(size, density, repeat, min_time))
+            record('flag_toggle', size, density, *benchFlags(size, density, repeat, min_time))
+            record('win_loss', size, density, *benchStatus(size, density, repeat, min_time))
+        record('flood_empty', size, 0.0, benchFlood(size, repeat, min_time))
+
+    return results
+
+def key(result):
+    return f"{result['benchmark']}:{result['size']}:{result['density']}"
+
+def compare(results, baseline, threshold, noise_floor):
+    '''returns the results that are slower than their baseline by more than threshold, with the ratio.
+    results where both timed calls took less than noise_floor are skipped'''
+    previous = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(key(result))
+        if not old or not old['seconds']:
+            continue
+        before = old['seconds']
+        if max(old.get('sample_seconds', before), result['sample_seconds']) < noise_floor:
+            continue
+        ratio = result['seconds'] / before
+        if ratio > threshold:
+            regressions.append(dict(result, baseline = before, ratio = ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Minesweeper engine benchmarks')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = SIZES, help = 'square board sizes')
+    parser.add_argument('--densities', type = float, nargs = '+', default = DENSITIES, help = 'mine densities')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'samples per benchmark, the median is kept')
+    parser.add_argument('--min-time', type = float, default = 0.1, help = 'least seconds timed per sample')
+    parser.add_argument('--output', default = None, help = 'write results here instead of stdout')
+    parser.add_argument('--baseline', default = BASELINE_PATH, help = 'baseline file to compare against')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'store the results as the baseline')
+    parser.add_argument('--threshold', type = float, default = 1.5,
+                        help = 'slowdown ratio reported as a regression')
+    parser.add_argument('--noise-floor', type = float, default = 1e-4,
+                        help = 'seconds per timed call or batch below which results are too noisy to compare')
+    args = parser.parse_args()
+
+    report = {'python': platform.python_version(),
+              'machine': platform.machine(),
+              'results': run(args.sizes, args.densities, args.repeat, args.min_time)}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent = 2)
+    else:
+        json.dump(report, sys.stdout, indent = 2)
+        sys.stdout.write('\n')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent = 2)
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except OSError:
+        sys.stderr.write(f'no baseline at {args.baseline}, run with --save-baseline to create one\n')
+        sys.exit(1)
+
+    regressions = compare(report['results'], baseline, args.threshold, args.noise_floor)
+    for regression in regressions:
+        sys.stderr.write(f"regression: {key(regression)} {regression['ratio']:.2f}x slower "
+                         f"({regression['baseline'] * 1000:.4f} ms -> {regression['seconds'] * 1000:.4f} ms)\n")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+import random
+from collections import deque
+
+from minesweeper import BoardActions, GameStatus, recordsChanges, NEIGHBORS_MASK, MINE, COVERED, FLAG
+
+OFFSETS = [(i, j) for i in range(-1, 2) for j in range(-1, 2) if i != 0 or j != 0]
+
+class WindowView:
+    '''view of the cells with a state bit set. membership works for any world cell,
+    iteration only walks the board's current window since the world has no edges'''
+
+    def __init__(self, game, bit):
+        self.game = game
+        self.bit = bit
+
+    def __contains__(self, xy):
+        return bool(self.game.peekCell(*xy) & self.bit)
+
+    def __iter__(self):
+        for xy in self.game.windowCells():
+            if self.game.cell(*xy) & self.bit:
+                yield xy
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+class ChunkedMinesweeper(BoardActions):
+    '''endless minesweeper world split into square chunks that are generated the first time they are touched.
+    mines in a chunk are derived from the world seed and chunk coordinates, so the world is the same
+    every time it is explored. dim_x and dim_y size a window at origin that the getters iterate over,
+    which keeps the same public API shape as Minesweeper'''
+
+    def __init__(self, dim_x = 30, dim_y = 16, density = 0.2, seed = None, chunk_size = 16, max_reveal = 20000):
+        super().__init__()
+        self.dim_x = dim_x
+        self.dim_y = dim_y
+        self.origin = (0, 0)
+
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.mines_per_chunk = round(density * chunk_size * chunk_size)
+        self.max_reveal = max_reveal # caps a single flood reveal, since regions can get huge
+
+        # chunks with mines placed, keyed by chunk coordinates. counted ones also hold neighbor counts
+        self.chunks = {}
+        self.counted = set()
+
+        self.num_flags = 0
+        self.num_revealed = 0
+        self.num_exploded = 0
+
+        self.flags = WindowView(self, FLAG)
+        self.tiles = WindowView(self, COVERED)
+        self.neighbors_field = None
+
+    # chunk generation
+    def placeMines(self, cx, cy):
+        '''returns the chunk at cx, cy with its mines placed, generating it if needed'''
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk
+
+        size = self.chunk_size
+        rng = random.Random(f'{self.seed}:{cx}:{cy}')
+        chunk = bytearray([COVERED]) * (size * size)
+        for i in rng.sample(range(size * size), self.mines_per_chunk):
+            x = cx * size + i % size
+            y = cy * size + i // size
+            # the cells around the spawn point are always clear so the first click is safe
+            if abs(x) <= 1 and abs(y) <= 1:
+                continue
+            chunk[i] |= MINE
+
+        self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def getChunk(self, cx, cy):
+        '''returns the chunk at cx, cy with neighbor counts filled in.
+        placing mines in the eight surrounding chunks is enough to count across borders'''
+        if (cx, cy) in self.counted:
+            return self.chunks[(cx, cy)]
+
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                self.placeMines(cx + i, cy + j)
+
+        size = self.chunk_size
+        chunk = self.chunks[(cx, cy)]
+        for k in range(size * size):
+            x = cx * size + k % size
+            y = cy * size + k // size
+            for i, j in OFFSETS:
+                ncx, nx = divmod(x + i, size)
+                ncy, ny = divmod(y + j, size)
+                if self.chunks[(ncx, ncy)][ny * size + nx] & MINE:
+                    chunk[k] += 1
+
+        self.counted.add((cx, cy))
+        return chunk
+
+    def cell(self, x, y):
+        '''returns the state byte of a world cell, generating its chunk if needed'''
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        return self.getChunk(cx, cy)[ly * self.chunk_size + lx]
+
+    def peekCell(self, x, y):
+        '''like cell() but never generates anything. untouched cells are covered'''
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            return COVERED
+        return chunk[ly * self.chunk_size + lx]
+
+    def setBits(self, x, y, set_bits = 0, clear_bits = 0):
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        chunk = self.getChunk(cx, cy)
+        i = ly * self.chunk_size + lx
+        chunk[i] = (chunk[i] | set_bits) & ~clear_bits
+
+    # window
+    def setOrigin(self, x, y):
+        '''moves the window the getters iterate over'''
+        self.origin = (x, y)
+        self.neighbors_field = None
+
+    def windowCells(self):
+        ox, oy = self.origin
+        for y in range(oy, oy + self.dim_y):
+            for x in range(ox, ox + self.dim_x):
+                yield (x, y)
+
+    # same API as Minesweeper
+    def getMines(self):
+        '''number of mines inside the window'''
+        return len(self.getMinesXY())
+
+    def getMinesXY(self):
+        return [xy for xy in self.windowCells() if self.cell(*xy) & MINE]
+
+    def isMine(self, x, y):
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        return bool(self.placeMines(cx, cy)[ly * self.chunk_size + lx] & MINE)
+
+    def isFlag(self, x, y):
+        return bool(self.peekCell(x, y) & FLAG)
+
+    def isCovered(self, x, y):
+        return bool(self.peekCell(x, y) & COVERED)
+
+    def getNeighbors(self, x, y):
+        return self.cell(x, y) & NEIGHBORS_MASK
+
+    def getFlags(self):
+        return self.num_flags
+
+    def getFlagsXY(self):
+        return self.flags
+
+    def getFlagsRemaining(self):
+        return self.getMines() - self.getFlags()
+
+    def getFlagsCorrect(self):
+        return sum(1 for chunk in self.chunks.values() for cell in chunk if cell & FLAG and cell & MINE)
+
+    @recordsChanges
+    def addFlag(self, x, y):
+        if self.cell(x, y) & FLAG:
+            return
+        self.setBits(x, y, set_bits = FLAG)
+        self.num_flags += 1
+        if self.changes is not None:
+            self.changes.flag((x, y))
+
+    @recordsChanges
+    def removeFlag(self, x, y):
+        if not self.peekCell(x, y) & FLAG:
+            raise ValueError(f'no flag at {(x, y)}')
+        self.setBits(x, y, clear_bits = FLAG)
+        self.num_flags -= 1
+        if self.changes is not None:
+            self.changes.unflag((x, y))
+
+    def getTilesXY(self):
+        return self.tiles
+
+    def getEmptyTiles(self):
+        return self.num_revealed + self.num_exploded
+
+    @recordsChanges
+    def removeTile(self, x, y):
+        cell = self.cell(x, y)
+        if not cell & COVERED:
+            raise ValueError(f'no tile at {(x, y)}')
+        self.setBits(x, y, clear_bits = COVERED)
+        if cell & MINE:
+            self.num_exploded += 1
+        else:
+            self.num_revealed += 1
+        if self.changes is not None:
+            self.changes.revealed.add((x, y))
+
+    @recordsChanges
+    def removeAdjacentTiles(self, x, y):
+        '''flood reveal with the same rule as Minesweeper.removeAdjacentTiles. crosses chunk borders
+        freely and stops after max_reveal cells. returns the set of revealed (x, y) cells'''
+        revealed = set()
+        queue = deque([(x, y)])
+        while queue and len(revealed) < self.max_reveal:
+            x, y = queue.popleft()
+            cell = self.cell(x, y)
+
+            # base cases
+            if not cell & COVERED or cell & MINE:
+                continue
+
+            self.setBits(x, y, clear_bits = COVERED)
+            self.num_revealed += 1
+            revealed.add((x, y))
+
+            # queue orthogonal neighbors that border at most one mine
+            for xy in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if self.cell(*xy) & NEIGHBORS_MASK <= 1:
+                    queue.append(xy)
+
+        if self.changes is not None:
+            self.changes.revealed |= revealed
+        return revealed
+
+    def copyCells(self):
+        '''returns a copy of the cell bytes of the window, row by row like Minesweeper.copyCells'''
+        return bytes(self.cell(*xy) for xy in self.windowCells())
+
+    def getNeighbors_field(self):
+        '''neighbor counts of the window, indexed [y - origin y][x - origin x]'''
+        if self.neighbors_field is None:
+            ox, oy = self.origin
+            self.neighbors_field = [[self.cell(x, y) & NEIGHBORS_MASK for x in range(ox, ox + self.dim_x)]
+                                    for y in range(oy, oy + self.dim_y)]
+        return self.neighbors_field
+
+    def validIndex(self, x, y):
+        # the world has no edges
+        return True
+
+    @property
+    def status(self):
+        # there is no way to win an endless world
+        if self.num_exploded:
+            return GameStatus.LOST
+        return GameStatus.PLAYING
+
+    def isWin(self):
+        return False
+
+    def isLoss(self):
+        return self.status == GameStatus.LOST
@@ -0,0 +1,235 @@
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from minesweeper import Minesweeper
+from solver import Solver
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'minecraftsweeper', 'boards.json')
+
+# the game takes boards on the main thread while refill results are added on the pool's
+# result thread, so every load, change and save of the cache happens under this lock
+CACHE_LOCK = threading.Lock()
+
+def buildBoard(dim_x, dim_y, num_mines, seed, first_click):
+    '''rebuilds the board for seed with the mines kept away from first_click'''
+    game = Minesweeper(dim_x, dim_y, num_mines, seed = seed, first_click_safe = True, safe_neighbors = True)
+    game.generate(*first_click)
+    return game
+
+def playBoard(dim_x, dim_y, num_mines, seed, first_click):
+    '''plays the board for seed from first_click using the solver only.
+    returns the game once the solver runs out of certain moves'''
+    game = buildBoard(dim_x, dim_y, num_mines, seed, first_click)
+    game.removeAdjacentTiles(*first_click)
+
+    solver = Solver(game)
+    while not game.isWin():
+        safe, _ = solver.solve()
+        safe = [xy for xy in safe if xy in game.getTilesXY()]
+        if not safe:
+            break
+        for x, y in safe:
+            game.removeAdjacentTiles(x, y)
+
+    return game
+
+def tryBoard(dim_x, dim_y, num_mines, seed, first_click):
+    '''worker entry point. returns (seed, accepted)'''
+    return seed, playBoard(dim_x, dim_y, num_mines, seed, first_click).isWin()
+
+def generateSeed(dim_x, dim_y, num_mines, first_click):
+    '''refill worker entry point. pool workers can't start processes of their own, so each one
+    samples on its own core'''
+    seed, _ = BoardGenerator(workers = 1).generate(dim_x, dim_y, num_mines, first_click)
+    return seed
+
+class BoardGenerator:
+    '''generates boards that can be won without guessing and keeps a small cache of them on disk.
+    boards are stored as seeds, since a seed and first click rebuild the same board'''
+
+    def __init__(self, cache_path = CACHE_PATH, cache_size = 10, workers = None):
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.workers = workers or os.cpu_count() or 1
+        self.refills = None # worker pool for refill(), started on first use
+        self.pending = {} # boards being generated by refill() per key
+
+    def generate(self, dim_x, dim_y, num_mines, first_click = None, rng = None, max_attempts = 100000):
+        '''rejection samples candidate seeds across a process pool until one is accepted.
+        returns (seed, stats) where stats holds attempts, acceptance rate and seconds taken'''
+        if first_click is None:
+            first_click = (dim_x // 2, dim_y // 2)
+        rng = rng or random.Random()
+        start = time.perf_counter()
+        attempts = 0
+        accepted = 0
+        seed = None
+
+        if self.workers == 1:
+            while seed is None and attempts < max_attempts:
+                attempts += 1
+                candidate, ok = tryBoard(dim_x, dim_y, num_mines, rng.randrange(2**32), first_click)
+                if ok:
+                    accepted += 1
+                    seed = candidate
+        else:
+            with ProcessPoolExecutor(self.workers) as pool:
+                # keep a couple of candidates queued per worker and stop at the first accepted one
+                pending = set()
+                submitted = 0
+                while seed is None and (pending or submitted < max_attempts):
+                    while len(pending) < self.workers * 2 and submitted < max_attempts:
+                        submitted += 1
+                        pending.add(pool.submit(tryBoard, dim_x, dim_y, num_mines,
+                                                rng.randrange(2**32), first_click))
+
+                    done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                    for future in done:
+                        attempts += 1
+                        candidate, ok = future.result()
+                        if ok:
+                            accepted += 1
+                            seed = seed if seed is not None else candidate
+
+                for future in pending:
+                    future.cancel()
+
+        if seed is None:
+            raise RuntimeError(f'no guess-free {dim_x}x{dim_y} board with {num_mines} mines '
+                               f'found in {attempts} attempts')
+
+        seconds = time.perf_counter() - start
+        stats = {'attempts': attempts,
+                 'acceptance_rate': accepted / attempts,
+                 'seconds': seconds}
+        return seed, stats
+
+    # on-disk cache
+    def key(self, dim_x, dim_y, num_mines, first_click):
+        return f'{dim_x}x{dim_y}:{num_mines}:{first_click[0]},{first_click[1]}'
+
+    def loadCache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveCache(self, cache):
+        # write to a temp file first so a crash never leaves a half written cache.
+        # the name is unique so other processes filling the same cache can't take it
+        directory = os.path.dirname(self.cache_path)
+        os.makedirs(directory, exist_ok = True)
+        fd, temp_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def take(self, dim_x, dim_y, num_mines, first_click = None):
+        '''pops a cached seed for the board, generating one on the spot if the cache is empty'''
+        if first_click is None:
+            first_click = (dim_x // 2, dim_y // 2)
+        key = self.key(dim_x, dim_y, num_mines, first_click)
+
+        try:
+            with CACHE_LOCK:
+                cache = self.loadCache()
+                seeds = cache.get(key, [])
+                if seeds:
+                    seed = seeds.pop()
+                    cache[key] = seeds
+                    self.saveCache(cache)
+                    return seed
+        except OSError:
+            # an unwritable cache shouldn't stop the game, it only makes boards slower to get
+            pass
+
+        seed, _ = self.generate(dim_x, dim_y, num_mines, first_click)
+        return seed
+
+    def fill(self, dim_x, dim_y, num_mines, first_click = None):
+        '''tops the cache up to cache_size boards for the key. returns the stats of each generated board'''
+        if first_click is None:
+            first_click = (dim_x // 2, dim_y // 2)
+        key = self.key(dim_x, dim_y, num_mines, first_click)
+
+        all_stats = []
+        while True:
+            with CACHE_LOCK:
+                if len(self.loadCache().get(key, [])) >= self.cache_size:
+                    break
+            seed, stats = self.generate(dim_x, dim_y, num_mines, first_click)
+            all_stats.append(stats)
+
+            # reload so boards taken or added meanwhile aren't overwritten
+            with CACHE_LOCK:
+                cache = self.loadCache()
+                cache.setdefault(key, []).append(seed)
+                self.saveCache(cache)
+
+        return all_stats
+
+    def refill(self, dim_x, dim_y, num_mines, first_click = None):
+        '''starts topping the cache up to cache_size boards for the key and returns at once.
+        the boards are generated in worker processes, so the caller's process only saves the seeds'''
+        if first_click is None:
+            first_click = (dim_x // 2, dim_y // 2)
+        key = self.key(dim_x, dim_y, num_mines, first_click)
+
+        with CACHE_LOCK:
+            missing = self.cache_size - len(self.loadCache().get(key, [])) - self.pending.get(key, 0)
+            if missing <= 0:
+                return
+            self.pending[key] = self.pending.get(key, 0) + missing
+
+        if self.refills is None:
+            self.refills = multiprocessing.Pool(min(self.workers, self.cache_size))
+        for _ in range(missing):
+            self.refills.apply_async(generateSeed, (dim_x, dim_y, num_mines, first_click),
+                                     callback = lambda seed: self.addSeed(key, seed),
+                                     error_callback = lambda error: self.addSeed(key, None))
+
+    def addSeed(self, key, seed):
+        '''saves a seed generated by refill(). None marks a failed attempt'''
+        with CACHE_LOCK:
+            self.pending[key] -= 1
+            if seed is None:
+                return
+            try:
+                cache = self.loadCache()
+                cache.setdefault(key, []).append(seed)
+                self.saveCache(cache)
+            except OSError:
+                pass
+
+    def close(self):
+        '''stops the refill workers, dropping any boards they haven't finished'''
+        if self.refills is not None:
+            self.refills.terminate()
+            self.refills = None
+
+def main():
+    '''pre-fills the cache. usage: python generator.py dim_x dim_y num_mines [count]'''
+    dim_x, dim_y, num_mines = [int(arg) for arg in sys.argv[1:4]]
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+
+    generator = BoardGenerator(cache_size = count)
+    for stats in generator.fill(dim_x, dim_y, num_mines):
+        print(f"{stats['attempts']} attempts, "
+              f"{stats['acceptance_rate']:.1%} accepted, "
+              f"{stats['seconds'] * 1000:.0f} ms")
+
+if __name__ == '__main__':
+    main()
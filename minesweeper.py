@@ -1,46 +1,375 @@
+import functools
 import random
+import types
+from collections import deque
+from enum import Enum
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# cell byte layout. low nibble holds the neighbor count (0-8), upper bits hold state
+NEIGHBORS_MASK = 0x0F
+MINE = 0x10
+COVERED = 0x20
+FLAG = 0x40
+
+def stateTable(mask, value):
+    '''bytes.translate table mapping cell bytes to 1 where cell & mask == value, else 0'''
+    return bytes(1 if cell & mask == value else 0 for cell in range(256))
+
+class GameStatus(Enum):
+    PLAYING = 0
+    WON = 1
+    LOST = 2
+
+class ChangeSet:
+    '''everything one action changed on the board, so consumers can do work proportional to the changes.
+    flags that were placed and removed again within the action cancel out'''
+
+    def __init__(self, previous_status):
+        self.revealed = set()
+        self.covered = set()
+        self.flagged = set()
+        self.unflagged = set()
+        self.generated = False # mines were placed, so neighbor counts changed
+        self.full_refresh = False # too much changed to list, re-read the whole board
+        self.previous_status = previous_status
+        self.status = previous_status
+
+    def flag(self, xy):
+        if xy in self.unflagged:
+            self.unflagged.discard(xy)
+        else:
+            self.flagged.add(xy)
+
+    def unflag(self, xy):
+        if xy in self.flagged:
+            self.flagged.discard(xy)
+        else:
+            self.unflagged.add(xy)
+
+    def statusChanged(self):
+        return self.status != self.previous_status
+
+    def isEmpty(self):
+        return not (self.revealed or self.covered or self.flagged or self.unflagged
+                    or self.generated or self.full_refresh or self.statusChanged())
+
+def recordsChanges(method, always = False):
+    '''collects the changes made by a public board action into one ChangeSet.
+    nested actions, e.g. reveal calling removeTile, add to the outermost action's set.
+    nothing is collected while there are no subscribers and no change queue, unless always is set.
+    actions then see self.changes as None'''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.change_depth == 0:
+            if not (always or self.subscribers or self.change_queue is not None):
+                return method(self, *args, **kwargs)
+            self.changes = ChangeSet(self.status)
+        self.change_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.change_depth -= 1
+            if self.change_depth == 0:
+                self.publishChanges()
+                self.changes = None
+    # BoardActions swaps these for the plain method while nobody reads change sets
+    wrapper.bypassable = not always
+    return wrapper
+
+def returnsChanges(method):
+    '''recordsChanges for actions that return their ChangeSet, so it is always collected'''
+    return recordsChanges(method, always = True)
+
+class CellView:
+    '''read only view of the board cells that have a state bit set.
+    supports O(1) membership checks and len() so callers can treat it like the old lists'''
+
+    def __init__(self, game, bit):
+        self.game = game
+        self.bit = bit
+
+    def __contains__(self, xy):
+        x, y = xy
+        if not self.game.validIndex(x, y):
+            return False
+        return bool(self.game.board[y * self.game.dim_x + x] & self.bit)
+
+    def __iter__(self):
+        dim_x = self.game.dim_x
+        bit = self.bit
+        for i, cell in enumerate(self.game.board):
+            if cell & bit:
+                yield (i % dim_x, i // dim_x)
+
+    def __len__(self):
+        return self.game.countCells(self.bit)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+class BoardActions:
+    '''change tracking and the player actions shared by every board. the actions are built on the
+    cell methods each board implements: isCovered, isFlag, addFlag, removeFlag, removeTile,
+    removeAdjacentTiles, getNeighbors, validIndex, status and num_exploded'''
+
+    recording_methods = {} # names of the bypassable recordsChanges methods per class
+
+    def __init__(self):
+        # change sets of the current action and where finished ones go
+        self.changes = None
+        self.change_depth = 0
+        self.subscribers = []
+        self.change_queue = None
+        self.trackChanges()
+
+    # change tracking
+    def trackChanges(self):
+        '''while nobody reads change sets, the recordsChanges methods are bound straight to the
+        undecorated method on the instance, so a bot toggling flags pays nothing for tracking'''
+        cls = type(self)
+        names = self.recording_methods.get(cls)
+        if names is None:
+            names = [name for name in dir(cls) if getattr(getattr(cls, name), 'bypassable', False)]
+            self.recording_methods[cls] = names
+
+        if self.subscribers or self.change_queue is not None:
+            for name in names:
+                self.__dict__.pop(name, None)
+        else:
+            for name in names:
+                setattr(self, name, types.MethodType(getattr(cls, name).__wrapped__, self))
+
+    def subscribe(self, callback):
+        '''calls callback(change_set) after every action that changed the board'''
+        self.subscribers.append(callback)
+        self.trackChanges()
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+        self.trackChanges()
+
+    def enableChangeQueue(self):
+        '''starts keeping change sets until drainChanges() is called'''
+        if self.change_queue is None:
+            self.change_queue = deque()
+            self.trackChanges()
+
+    def drainChanges(self):
+        '''returns and forgets the queued change sets, oldest first'''
+        if not self.change_queue:
+            return []
+        changes = list(self.change_queue)
+        self.change_queue.clear()
+        return changes
+
+    def publishChanges(self):
+        changes = self.changes
+        changes.status = self.status
+        if changes.isEmpty():
+            return
+        if self.change_queue is not None:
+            self.change_queue.append(changes)
+        for callback in self.subscribers:
+            callback(changes)
+
+    # player actions
+    @recordsChanges
+    def reveal(self, x, y):
+        '''left click on a tile. runs the flood reveal and uncovers the clicked tile even if it's a mine.
+        returns the set of revealed (x, y) cells'''
+        revealed = self.removeAdjacentTiles(x, y)
+        if self.isCovered(x, y):
+            self.removeTile(x, y)
+            revealed.add((x, y))
+        return revealed
+
+    @recordsChanges
+    def toggleFlag(self, x, y):
+        '''right click on a tile. returns True if a flag was placed'''
+        if self.isFlag(x, y):
+            self.removeFlag(x, y)
+            return False
+        self.addFlag(x, y)
+        return True
+
+    @recordsChanges
+    def chord(self, x, y):
+        '''reveals every unflagged neighbor of a revealed number once enough flags surround it.
+        returns the set of revealed (x, y) cells'''
+        revealed = set()
+        if not self.validIndex(x, y) or self.isCovered(x, y):
+            return revealed
+
+        neighbors = [(x + i, y + j) for i in range(-1, 2) for j in range(-1, 2)
+                     if (i or j) and self.validIndex(x + i, y + j)]
+        flags = sum(1 for xy in neighbors if self.isFlag(*xy))
+        if flags != self.getNeighbors(x, y):
+            return revealed
+
+        for xy in neighbors:
+            if self.isCovered(*xy) and not self.isFlag(*xy):
+                revealed |= self.reveal(*xy)
+        return revealed
+
+    @returnsChanges
+    def applyActions(self, actions):
+        '''applies a batch of (kind, x, y) actions in one pass, where kind is 'reveal', 'flag', 'unflag',
+        'toggle' or 'chord'. stops early once a mine goes off. returns one ChangeSet for the whole batch'''
+        for kind, x, y in actions:
+            if not self.validIndex(x, y):
+                continue
 
-class Minesweeper:
+            if kind == 'reveal':
+                if not self.isFlag(x, y):
+                    self.reveal(x, y)
+            elif kind == 'chord':
+                self.chord(x, y)
+            elif kind == 'flag' or (kind == 'toggle' and not self.isFlag(x, y)):
+                if self.isCovered(x, y) and not self.isFlag(x, y):
+                    self.addFlag(x, y)
+            elif kind == 'unflag' or kind == 'toggle':
+                if self.isFlag(x, y):
+                    self.removeFlag(x, y)
+            else:
+                raise ValueError(f'unknown action {kind!r}')
+
+            if self.num_exploded:
+                break
+
+        self.changes.status = self.status
+        return self.changes
+
+    def revealCells(self, cells):
+        '''reveals a list of (x, y) cells in one pass'''
+        return self.applyActions(('reveal', x, y) for x, y in cells)
+
+    def flagCells(self, cells):
+        '''flags a list of covered (x, y) cells in one pass'''
+        return self.applyActions(('flag', x, y) for x, y in cells)
+
+class Minesweeper(BoardActions):
     '''minesweeper game object. contains mechanics and game states'''
 
-    def __init__(self, dim_x = 10, dim_y = 10, num_mines = 10):
+    def __init__(self, dim_x = 10, dim_y = 10, num_mines = 10, seed = None, rng = None,
+                 first_click_safe = False, safe_neighbors = False):
+        super().__init__()
         self.dim_x = dim_x
         self.dim_y = dim_y
+        self.origin = (0, 0) # top left cell. boards that are a window into a bigger world move it
         self.num_mines = num_mines
         self.num_flags = 0
 
-        self.mines = self.random_mines(num_mines)
-
-        self.flags = []
-        self.tiles = [(x, y) for x in range(self.dim_x) for y in range(self.dim_y)]
-        self.neighbors_field = [[0 for i in range(self.dim_x)] for j in range(self.dim_y)]
+        # boards are reproducible from their seed unless a random.Random is passed in
+        if seed is None and rng is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
+
+        # with first_click_safe, mines are placed on the first reveal and never under it
+        self.first_click_safe = first_click_safe
+        self.safe_neighbors = safe_neighbors
+        self.generated = False
+        self.first_click = None # cell kept clear when the mines were placed
+
+        # flat board, one byte per cell indexed by y * dim_x + x
+        self.board = bytearray([COVERED]) * (self.dim_x * self.dim_y)
+        self.num_tiles = self.dim_x * self.dim_y
+
+        # win/loss counters, updated on every reveal so status checks are O(1)
+        self.num_covered_safe = self.num_tiles - num_mines
+        self.num_exploded = 0
+
+        self.mines = []
+        self.flags = CellView(self, FLAG)
+        self.tiles = CellView(self, COVERED)
+        self.neighbors_field = None
+
+        if not first_click_safe:
+            self.generate()
+
+    @recordsChanges
+    def generate(self, x = None, y = None):
+        '''places the mines and calculates neighbor counts. x, y is kept free of mines if given'''
+        exclude = set()
+        if x is not None:
+            self.first_click = (x, y)
+            exclude.add(self.index(x, y))
+            # only keep the neighbors clear if there is room for the mines elsewhere
+            if self.safe_neighbors and self.dim_x * self.dim_y - 9 >= self.num_mines:
+                exclude.update(self.index(x + i, y + j) for i in range(-1, 2) for j in range(-1, 2)
+                               if self.validIndex(x + i, y + j))
+
+        self.mines = self.random_mines(self.num_mines, exclude)
+        for mine_x, mine_y in self.mines:
+            self.board[self.index(mine_x, mine_y)] |= MINE
 
         self.calcNeighbors_field()
-
-    def random_mines(self, num_mines):
-        mines = []
-        for i in range(num_mines):
-            x = random.randint(0, self.dim_x - 1)
-            y = random.randint(0, self.dim_y - 1)
-
-            while (x,y) in mines:
-                x = random.randint(0, self.dim_x - 1)
-                y = random.randint(0, self.dim_y - 1)
-
-            mines.append((x,y))
-
-        return mines
+        self.generated = True
+        if self.changes is not None:
+            self.changes.generated = True
+
+    def random_mines(self, num_mines, exclude = ()):
+        '''picks num_mines distinct cells with a single sample over the cell indices'''
+        num_cells = self.dim_x * self.dim_y
+        if num_mines > num_cells - len(exclude):
+            raise ValueError(f'cannot place {num_mines} mines on a {self.dim_x}x{self.dim_y} board')
+
+        # sample extra indices to cover the excluded ones. the sample order is random,
+        # so the first num_mines that aren't excluded are still a uniform pick
+        sample = self.rng.sample(range(num_cells), min(num_cells, num_mines + len(exclude)))
+        if exclude:
+            sample = [i for i in sample if i not in exclude][:num_mines]
+
+        return [(i % self.dim_x, i // self.dim_x) for i in sample]
+
+    def index(self, x, y):
+        '''converts grid coordinates to the flat board index'''
+        return y * self.dim_x + x
+
+    def countCells(self, bit):
+        if bit == COVERED:
+            return self.num_tiles
+        if bit == FLAG:
+            return self.num_flags
+        if bit == MINE:
+            return self.num_mines
+        return len(self.board) - self.board.translate(stateTable(bit, 0)).count(1)
 
     def getMines(self):
         return self.num_mines
 
     def getMinesXY(self):
+        if self.mines is None:
+            mine_cells = self.board.translate(stateTable(MINE, MINE))
+            self.mines = []
+            i = mine_cells.find(1)
+            while i != -1:
+                self.mines.append((i % self.dim_x, i // self.dim_x))
+                i = mine_cells.find(1, i + 1)
         return self.mines
 
     def isMine(self, x, y):
-        if (x, y) in self.getMinesXY():
-            return True
-        return False
+        if not self.validIndex(x, y):
+            return False
+        return bool(self.board[self.index(x, y)] & MINE)
+
+    def isFlag(self, x, y):
+        if not self.validIndex(x, y):
+            return False
+        return bool(self.board[self.index(x, y)] & FLAG)
+
+    def isCovered(self, x, y):
+        if not self.validIndex(x, y):
+            return False
+        return bool(self.board[self.index(x, y)] & COVERED)
+
+    def getNeighbors(self, x, y):
+        '''returns the number of mines adjacent to a cell'''
+        return self.board[self.index(x, y)] & NEIGHBORS_MASK
 
     def getFlags(self):
         return self.num_flags
@@ -54,74 +383,167 @@ class Minesweeper:
     def getFlagsCorrect(self):
         acc = 0
         for flag in self.getFlagsXY():
-            if flag in self.getMinesXY():
+            if self.isMine(*flag):
                 acc += 1
         return acc
 
+    @recordsChanges
     def addFlag(self, x, y):
-        self.flags.append((x,y))
+        i = self.index(x, y)
+        if self.board[i] & FLAG:
+            return
+        self.board[i] |= FLAG
         self.num_flags += 1
+        if self.changes is not None:
+            self.changes.flag((x, y))
 
+    @recordsChanges
     def removeFlag(self, x, y):
-        self.flags.remove((x,y))
+        i = self.index(x, y)
+        if not self.board[i] & FLAG:
+            raise ValueError(f'no flag at {(x, y)}')
+        self.board[i] &= ~FLAG
         self.num_flags -= 1
+        if self.changes is not None:
+            self.changes.unflag((x, y))
 
     def getTilesXY(self):
         return self.tiles
 
     def getEmptyTiles(self):
-        return (self.dim_x * self.dim_y) - len(self.getTilesXY())
+        return (self.dim_x * self.dim_y) - self.num_tiles
 
+    @recordsChanges
     def addTile(self, x, y):
-        self.tiles.append((x,y))
-
+        i = self.index(x, y)
+        if self.board[i] & COVERED:
+            return
+        self.board[i] |= COVERED
+        self.num_tiles += 1
+        if self.changes is not None:
+            self.changes.covered.add((x, y))
+            self.changes.revealed.discard((x, y))
+        if self.board[i] & MINE:
+            self.num_exploded -= 1
+        else:
+            self.num_covered_safe += 1
+
+    @recordsChanges
     def removeTile(self, x, y):
-        self.tiles.remove((x,y))
-
+        if not self.generated:
+            self.generate(x, y)
+        i = self.index(x, y)
+        if not self.board[i] & COVERED:
+            raise ValueError(f'no tile at {(x, y)}')
+        self.board[i] &= ~COVERED
+        self.num_tiles -= 1
+        if self.board[i] & MINE:
+            self.num_exploded += 1
+        else:
+            self.num_covered_safe -= 1
+        if self.changes is not None:
+            self.changes.revealed.add((x, y))
+
+    @recordsChanges
     def removeAdjacentTiles(self, x, y):
-        # base cases
+        '''reveals the tile at x, y and spreads through orthogonal neighbors with 0 or 1 adjacent mines.
+        uses a queue instead of recursion so large empty regions don't hit the recursion limit.
+        returns the set of revealed (x, y) cells'''
+        revealed = set()
         if not self.validIndex(x, y):
-            return
+            return revealed
+        if not self.generated:
+            self.generate(x, y)
 
-        if (x, y) not in self.getTilesXY():
-            return
-
-        if (x,y) in self.getMinesXY():
-            return
+        board = self.board
+        dim_x = self.dim_x
+        dim_y = self.dim_y
 
-        self.removeTile(x, y)
-
-        # TODO: There's probably a better way to write this
-        adjacent = []
-        for i in [-1, 1]:
-            x_temp = x + i
-            if not self.validIndex(x_temp, y):
-                continue
-            if self.getNeighbors_field()[y][x_temp] in [0,1]:
-                adjacent.append((x_temp, y))
+        queue = deque([self.index(x, y)])
+        while queue:
+            i = queue.popleft()
+            cell = board[i]
 
-        for i in [-1, 1]:
-            y_temp = y + i
-            if not self.validIndex(x, y_temp):
+            # base cases
+            if not cell & COVERED or cell & MINE:
                 continue
-            if self.getNeighbors_field()[y_temp][x] in [0,1]:
-                adjacent.append((x, y_temp))
-
-        for x,y in adjacent:
-            self.removeAdjacentTiles(x, y)
-
 
+            board[i] = cell & ~COVERED
+            self.num_tiles -= 1
+            self.num_covered_safe -= 1
+            x, y = i % dim_x, i // dim_x
+            revealed.add((x, y))
+
+            # queue orthogonal neighbors that border at most one mine
+            if x > 0 and board[i - 1] & NEIGHBORS_MASK <= 1:
+                queue.append(i - 1)
+            if x < dim_x - 1 and board[i + 1] & NEIGHBORS_MASK <= 1:
+                queue.append(i + 1)
+            if y > 0 and board[i - dim_x] & NEIGHBORS_MASK <= 1:
+                queue.append(i - dim_x)
+            if y < dim_y - 1 and board[i + dim_x] & NEIGHBORS_MASK <= 1:
+                queue.append(i + dim_x)
+
+        if self.changes is not None:
+            self.changes.revealed |= revealed
+        return revealed
+
+    @recordsChanges
     def resetTiles(self):
-        self.tiles = [(x, y) for x in range(self.dim_x) for y in range(self.dim_y)]
+        for i in range(len(self.board)):
+            self.board[i] |= COVERED
+        self.num_tiles = self.dim_x * self.dim_y
+        self.num_covered_safe = self.num_tiles - self.num_mines
+        self.num_exploded = 0
+        if self.changes is not None:
+            self.changes.full_refresh = True
+
+    @recordsChanges
+    def setBoard(self, board, generated = True):
+        '''replaces every cell byte at once, e.g. from a save file, and recounts the game state'''
+        self.board = bytearray(board)
+        self.generated = generated
+
+        self.num_tiles = self.board.translate(stateTable(COVERED, COVERED)).count(1)
+        self.num_flags = self.board.translate(stateTable(FLAG, FLAG)).count(1)
+        self.num_covered_safe = self.board.translate(stateTable(MINE | COVERED, COVERED)).count(1)
+        self.num_exploded = self.board.translate(stateTable(MINE | COVERED, MINE)).count(1)
+
+        # the mine list is rebuilt lazily by getMinesXY, most loads never need it
+        self.mines = None
+        if generated:
+            self.num_mines = self.board.translate(stateTable(MINE, MINE)).count(1)
+        else:
+            # mines get placed on the first reveal, so every cell but num_mines of them is safe
+            self.num_covered_safe = self.num_tiles - self.num_mines
+
+        self.neighbors_field = None
+        if self.changes is not None:
+            self.changes.full_refresh = True
+
+    def copyCells(self):
+        '''returns a copy of the cell bytes of the board, row by row'''
+        return bytes(self.board)
 
     def getNeighbors_field(self):
+        # neighbor counts never change once the board is built, so the nested list is cached
+        if self.neighbors_field is None:
+            dim_x = self.dim_x
+            self.neighbors_field = [[cell & NEIGHBORS_MASK for cell in self.board[row:row + dim_x]]
+                                    for row in range(0, len(self.board), dim_x)]
         return self.neighbors_field
 
     def calcNeighbors_field(self):
-        for xy in self.mines:
+        '''adds the number of adjacent mines to every cell. uses a vectorized numpy pass when available'''
+        if np is not None:
+            self.calcNeighbors_field_numpy()
+            self.neighbors_field = None
+            return
+
+        for xy in self.getMinesXY():
             for i in range(-1, 2):
                 for j in range(-1, 2):
-                    if i == 0 and j == 0: 
+                    if i == 0 and j == 0:
                         continue
 
                     row_index = xy[0] + i
@@ -130,21 +552,41 @@ class Minesweeper:
                     # check for invalid incices
                     if not self.validIndex(row_index, col_index):
                         continue
-                    
-                    self.neighbors_field[col_index][row_index] += 1
+
+                    self.board[self.index(row_index, col_index)] += 1
+
+        self.neighbors_field = None
+
+    def calcNeighbors_field_numpy(self):
+        # sum the eight shifted slices of a zero padded mine mask
+        cells = np.frombuffer(self.board, dtype = np.uint8).reshape(self.dim_y, self.dim_x)
+        padded = np.zeros((self.dim_y + 2, self.dim_x + 2), dtype = np.uint8)
+        padded[1:-1, 1:-1] = (cells & MINE) != 0
+
+        counts = np.zeros((self.dim_y, self.dim_x), dtype = np.uint8)
+        for i in range(3):
+            for j in range(3):
+                if i == 1 and j == 1:
+                    continue
+                counts += padded[i:i + self.dim_y, j:j + self.dim_x]
+
+        self.board[:] = (cells + counts).tobytes()
 
     def validIndex(self, x, y):
         if (x < 0 or x >= self.dim_x) or (y < 0 or y >= self.dim_y):
             return False
         return True
 
+    @property
+    def status(self):
+        if self.num_exploded:
+            return GameStatus.LOST
+        if not self.num_covered_safe:
+            return GameStatus.WON
+        return GameStatus.PLAYING
+
     def isWin(self):
-        if set(self.getMinesXY()) == set(self.getTilesXY()):
-            return True
-        return False
+        return self.status == GameStatus.WON
 
     def isLoss(self):
-        for mine in self.getMinesXY():
-            if mine not in self.getTilesXY():
-                return True
-        return False
\ No newline at end of file
+        return self.status == GameStatus.LOST
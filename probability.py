@@ -0,0 +1,184 @@
+import math
+import threading
+
+from minesweeper import COVERED, NEIGHBORS_MASK
+from solver import Solver
+
+class ProbabilityEngine:
+    '''exact mine probability of every covered cell. the frontier is split into independent components
+    that are enumerated separately, then combined with the number of ways the remaining mines fit
+    in the interior. can run on a worker thread so the caller never waits on the enumeration'''
+
+    def __init__(self, game, max_component = 32, max_steps = 500000):
+        self.game = game
+        self.max_component = max_component
+        self.max_steps = max_steps
+
+        # component tallies keyed by the component's constraints. a changed neighbor changes the key
+        self.cache = {}
+
+        # latest finished result, (probabilities, exact), read by the main thread
+        self.result = None
+        # True from a request until its result is in, so the caller knows to keep polling
+        self.busy = False
+
+        # worker thread state
+        self.lock = threading.Condition()
+        self.pending = None
+        self.cancelled = threading.Event()
+        self.worker = None
+
+    def snapshot(self):
+        '''copies the board so compute() can run while it keeps changing. this runs on the caller's
+        thread, so it only copies the cells and leaves reading them to compute()'''
+        game = self.game
+        return BoardSnapshot(game.copyCells(), game.dim_x, game.dim_y, game.origin, game.getMines())
+
+    def compute(self, snapshot = None, cancelled = None):
+        '''returns (probabilities, exact) where probabilities maps every covered (x, y) to its mine probability.
+        exact is False when a component was too large to enumerate and its cells were treated like interior cells.
+        returns None if cancelled() turns true first'''
+        board = self.snapshot() if snapshot is None else snapshot
+        solver = Solver(board, max_component = self.max_component, max_steps = self.max_steps)
+        covered = board.getTilesXY()
+        num_mines = board.getMines()
+
+        # nothing revealed yet, every cell is alike
+        if len(covered) == board.dim_x * board.dim_y:
+            p = num_mines / len(covered) if covered else 0.0
+            return {xy: p for xy in covered}, True
+
+        exact = True
+        cache = {}
+        components = []
+        frontier = set()
+        for component in solver.splitComponents(solver.findConstraints(set())):
+            key = frozenset(component)
+            if key in self.cache:
+                tally = self.cache[key]
+            else:
+                tally = solver.tallyComponent(component, cancelled)
+                if cancelled and cancelled():
+                    return None
+            # components that can't be enumerated are cached too, so they aren't retried every time
+            cache[key] = tally
+            if tally is None:
+                exact = False
+                continue
+            components.append(tally)
+            frontier.update(tally[0])
+        # keep only components that are still on the board
+        self.cache = cache
+
+        interior = [xy for xy in covered if xy not in frontier]
+        num_interior = len(interior)
+
+        def interiorWays(frontier_mines):
+            left = num_mines - frontier_mines
+            if left < 0 or left > num_interior:
+                return 0
+            return math.comb(num_interior, left)
+
+        # distributions map a mine total to the number of solutions of a group of components using it.
+        # prefix[i] combines the components before i, suffix[i] those from i on
+        distributions = [{t: count for t, (count, _) in totals.items()} for _, totals in components]
+        prefix = [{0: 1}]
+        for distribution in distributions:
+            prefix.append(convolve(prefix[-1], distribution))
+        suffix = [{0: 1}]
+        for distribution in reversed(distributions):
+            suffix.append(convolve(suffix[-1], distribution))
+        suffix.reverse()
+
+        # every assignment of the whole board, weighted by its interior arrangements
+        weights = {t: ways * interiorWays(t) for t, ways in prefix[-1].items()}
+        total = sum(weights.values())
+        if not total:
+            # the revealed numbers contradict the mine count, e.g. after a loss
+            return None
+
+        probabilities = {}
+        for i, (cells, totals) in enumerate(components):
+            others = convolve(prefix[i], suffix[i + 1])
+            for t, (_, counts) in totals.items():
+                weight = sum(ways * interiorWays(t + r) for r, ways in others.items())
+                if not weight:
+                    continue
+                for xy, count in zip(cells, counts):
+                    probabilities[xy] = probabilities.get(xy, 0) + count * weight
+
+        for xy in probabilities:
+            probabilities[xy] /= total
+
+        if num_interior:
+            expected = sum(weight * (num_mines - t) for t, weight in weights.items())
+            p = expected / (total * num_interior)
+            for xy in interior:
+                probabilities[xy] = p
+
+        return probabilities, exact
+
+    # worker thread
+    def request(self):
+        '''starts computing the current board in the background, cancelling any older request'''
+        snapshot = self.snapshot()
+        with self.lock:
+            self.pending = snapshot
+            self.busy = True
+            self.cancelled.set()
+            self.lock.notify()
+            if self.worker is None:
+                self.worker = threading.Thread(target = self.work, daemon = True)
+                self.worker.start()
+
+    def work(self):
+        while True:
+            with self.lock:
+                while self.pending is None:
+                    self.lock.wait()
+                snapshot = self.pending
+                self.pending = None
+                self.cancelled.clear()
+
+            result = self.compute(snapshot, self.cancelled.is_set)
+            if result is not None and not self.cancelled.is_set():
+                self.result = result
+            with self.lock:
+                if self.pending is None:
+                    self.busy = False
+
+class BoardSnapshot:
+    '''a frozen copy of a board's cells with the getters the solver reads. only the copied window
+    is known, so on an endless board the numbers on its edge are read as if the world ended there'''
+
+    def __init__(self, board, dim_x, dim_y, origin, num_mines):
+        self.board = board
+        self.dim_x = dim_x
+        self.dim_y = dim_y
+        self.origin = origin
+        self.num_mines = num_mines
+
+    def getMines(self):
+        return self.num_mines
+
+    def validIndex(self, x, y):
+        ox, oy = self.origin
+        return ox <= x < ox + self.dim_x and oy <= y < oy + self.dim_y
+
+    def getTilesXY(self):
+        dim_x = self.dim_x
+        ox, oy = self.origin
+        return [(ox + i % dim_x, oy + i // dim_x) for i, cell in enumerate(self.board) if cell & COVERED]
+
+    def getNeighbors_field(self):
+        dim_x = self.dim_x
+        return [[cell & NEIGHBORS_MASK for cell in self.board[row:row + dim_x]]
+                for row in range(0, len(self.board), dim_x)]
+
+def convolve(a, b):
+    '''combines two {mines: ways} distributions of independent groups'''
+    combined = {}
+    for i, ways_a in a.items():
+        for j, ways_b in b.items():
+            combined[i + j] = combined.get(i + j, 0) + ways_a * ways_b
+    return combined
@@ -0,0 +1,134 @@
+import os
+import struct
+import sys
+import time
+
+from minesweeper import Minesweeper
+
+REPLAY_PATH = os.path.join(os.path.expanduser('~'), '.local', 'share', 'minecraftsweeper', 'last_game.mcr')
+
+# file layout, all little endian:
+#   header: magic, version, options, dim_x, dim_y, num_mines, seed, first click x, first click y
+#   events: kind, milliseconds since the previous event, x, y
+MAGIC = b'MCRP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIQHH')
+EVENT = struct.Struct('<BIHH')
+
+# header option bits
+FIRST_CLICK_SAFE = 0x1
+SAFE_NEIGHBORS = 0x2
+PREGENERATED = 0x4 # mines were placed around first click before any input, e.g. guess-free boards
+
+# event kinds
+REVEAL = 0
+FLAG = 1
+TICK = 2
+
+class ReplayFormatError(ValueError):
+    pass
+
+class Recorder:
+    '''records the board setup and every input the Game scene applies to it'''
+
+    def __init__(self, game):
+        if game.seed is None:
+            raise ValueError('only boards built from a seed can be recorded')
+        if game.getEmptyTiles() or game.getFlags():
+            raise ValueError('recording has to start before the first input')
+
+        options = 0
+        if game.first_click_safe:
+            options |= FIRST_CLICK_SAFE
+        if game.safe_neighbors:
+            options |= SAFE_NEIGHBORS
+        first_click = (0, 0)
+        if game.first_click_safe and game.generated:
+            options |= PREGENERATED
+            first_click = game.first_click
+
+        self.header = HEADER.pack(MAGIC, VERSION, options, game.dim_x, game.dim_y, game.num_mines,
+                                  game.seed, *first_click)
+        self.events = bytearray()
+        self.last_time = time.perf_counter()
+
+    def record(self, kind, x = 0, y = 0):
+        now = time.perf_counter()
+        delta_ms = int((now - self.last_time) * 1000)
+        self.last_time = now
+        self.events += EVENT.pack(kind, delta_ms, x, y)
+
+    def save(self, path = REPLAY_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+        with open(path, 'wb') as f:
+            f.write(self.header)
+            f.write(self.events)
+
+class Replay:
+    '''a recorded game. rebuilds the starting board and steps through the inputs'''
+
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise ReplayFormatError('replay is too short')
+        (magic, version, self.options, self.dim_x, self.dim_y, self.num_mines,
+         self.seed, first_x, first_y) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayFormatError(f'not a version {VERSION} replay')
+        self.first_click = (first_x, first_y) if self.options & PREGENERATED else None
+
+        # events as (kind, milliseconds since start, x, y)
+        self.events = []
+        elapsed = 0
+        for kind, delta_ms, x, y in EVENT.iter_unpack(data[HEADER.size:]):
+            elapsed += delta_ms
+            self.events.append((kind, elapsed, x, y))
+
+    @classmethod
+    def load(cls, path = REPLAY_PATH):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def newBoard(self):
+        '''returns the board exactly as it was before the first recorded input'''
+        game = Minesweeper(self.dim_x, self.dim_y, self.num_mines, seed = self.seed,
+                           first_click_safe = bool(self.options & FIRST_CLICK_SAFE),
+                           safe_neighbors = bool(self.options & SAFE_NEIGHBORS))
+        if self.first_click is not None:
+            game.generate(*self.first_click)
+        return game
+
+    def apply(self, game, event):
+        '''applies one event to the board. returns 1 for a timer tick, else 0'''
+        kind, _, x, y = event
+        if kind == REVEAL:
+            game.reveal(x, y)
+        elif kind == FLAG:
+            game.toggleFlag(x, y)
+        elif kind == TICK:
+            return 1
+        return 0
+
+    def play(self):
+        '''replays every event at full speed. returns (game, in_game_time)'''
+        game = self.newBoard()
+        in_game_time = 0
+        for event in self.events:
+            in_game_time += self.apply(game, event)
+        return game, in_game_time
+
+def main():
+    '''replays a recording headlessly. usage: python replay.py [path]'''
+    path = sys.argv[1] if len(sys.argv) > 1 else REPLAY_PATH
+    replay = Replay.load(path)
+
+    start = time.perf_counter()
+    game, in_game_time = replay.play()
+    seconds = time.perf_counter() - start
+
+    print(f'{replay.dim_x}x{replay.dim_y} with {replay.num_mines} mines, seed {replay.seed}')
+    print(f'{len(replay.events)} events replayed in {seconds * 1000:.2f} ms')
+    print(f'status: {game.status.name.lower()}, time: {in_game_time}, '
+          f'revealed: {game.getEmptyTiles()}, flags: {game.getFlags()}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import mmap
+import os
+import struct
+
+from minesweeper import Minesweeper, NEIGHBORS_MASK, MINE, COVERED, FLAG, stateTable
+
+SAVE_PATH = os.path.join(os.path.expanduser('~'), '.local', 'share', 'minecraftsweeper', 'quicksave.mcsw')
+
+# file layout, all little endian:
+#   header: magic, version, options, dim_x, dim_y, num_mines, seed, in_game_time
+#   mine, covered and flag bitmaps, one bit per cell, cell i in bit i % 8 of byte i // 8
+#   neighbor counts, one nibble per cell, cell i in the low nibble of byte i // 2 when i is even
+MAGIC = b'MCSW'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIQI')
+
+# header option bits
+HAS_SEED = 0x1
+GENERATED = 0x2
+FIRST_CLICK_SAFE = 0x4
+SAFE_NEIGHBORS = 0x8
+
+class SaveFormatError(ValueError):
+    pass
+
+# bit packing. cells become one 0/1 byte each, then eight strided slices are merged as big
+# integers. no byte ever exceeds 255, so nothing carries between bytes and it all runs in C
+def packBits(cells):
+    size = (len(cells) + 7) // 8
+    cells = bytes(cells) + bytes(size * 8 - len(cells))
+    packed = 0
+    for k in range(8):
+        packed |= int.from_bytes(cells[k::8], 'little') << k
+    return packed.to_bytes(size, 'little')
+
+def unpackBits(data, num_cells):
+    size = (num_cells + 7) // 8
+    packed = int.from_bytes(data[:size], 'little')
+    ones = int.from_bytes(b'\x01' * size, 'little')
+
+    cells = bytearray(size * 8)
+    for k in range(8):
+        cells[k::8] = ((packed >> k) & ones).to_bytes(size, 'little')
+    return cells[:num_cells]
+
+def packNibbles(values):
+    size = (len(values) + 1) // 2
+    values = bytes(values) + bytes(size * 2 - len(values))
+    packed = int.from_bytes(values[0::2], 'little') | int.from_bytes(values[1::2], 'little') << 4
+    return packed.to_bytes(size, 'little')
+
+def unpackNibbles(data, num_cells):
+    size = (num_cells + 1) // 2
+    packed = int.from_bytes(data[:size], 'little')
+    low = int.from_bytes(b'\x0f' * size, 'little')
+
+    values = bytearray(size * 2)
+    values[0::2] = (packed & low).to_bytes(size, 'little')
+    values[1::2] = ((packed >> 4) & low).to_bytes(size, 'little')
+    return values[:num_cells]
+
+def layout(dim_x, dim_y):
+    '''returns the byte offsets of the mine, covered, flag and neighbor sections and the file size'''
+    num_cells = dim_x * dim_y
+    bitmap = (num_cells + 7) // 8
+    mines = HEADER.size
+    covered = mines + bitmap
+    flags = covered + bitmap
+    neighbors = flags + bitmap
+    return mines, covered, flags, neighbors, neighbors + (num_cells + 1) // 2
+
+def save(game, path = SAVE_PATH, in_game_time = 0):
+    '''writes the board state and elapsed time to path'''
+    options = 0
+    if game.seed is not None:
+        options |= HAS_SEED
+    if game.generated:
+        options |= GENERATED
+    if game.first_click_safe:
+        options |= FIRST_CLICK_SAFE
+    if game.safe_neighbors:
+        options |= SAFE_NEIGHBORS
+
+    board = bytes(game.board)
+    header = HEADER.pack(MAGIC, VERSION, options, game.dim_x, game.dim_y, game.num_mines,
+                         game.seed or 0, in_game_time)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(packBits(board.translate(stateTable(MINE, MINE))))
+        f.write(packBits(board.translate(stateTable(COVERED, COVERED))))
+        f.write(packBits(board.translate(stateTable(FLAG, FLAG))))
+        f.write(packNibbles(board.translate(bytes(cell & NEIGHBORS_MASK for cell in range(256)))))
+    os.replace(temp_path, path)
+
+def load(path = SAVE_PATH):
+    '''returns (game, in_game_time) for the save at path'''
+    with SaveFile(path) as save_file:
+        return save_file.toGame(), save_file.in_game_time
+
+class SaveFile:
+    '''memory-mapped save file. single cells can be read straight from the bitmaps,
+    so very large boards can be inspected without unpacking the whole file'''
+
+    def __init__(self, path = SAVE_PATH):
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise SaveFormatError(f'{path} is empty')
+
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise SaveFormatError(f'{path} is too short to be a save file')
+
+        (magic, version, self.options, self.dim_x, self.dim_y, self.num_mines,
+         seed, self.in_game_time) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SaveFormatError(f'{path} is not a version {VERSION} save file')
+        self.seed = seed if self.options & HAS_SEED else None
+
+        (self.mines_offset, self.covered_offset, self.flags_offset,
+         self.neighbors_offset, size) = layout(self.dim_x, self.dim_y)
+        if len(self.data) < size:
+            self.close()
+            raise SaveFormatError(f'{path} is truncated')
+
+    def close(self):
+        if hasattr(self, 'data'):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # random access
+    def bit(self, offset, x, y):
+        i = y * self.dim_x + x
+        return bool(self.data[offset + i // 8] >> (i % 8) & 1)
+
+    def isMine(self, x, y):
+        return self.bit(self.mines_offset, x, y)
+
+    def isCovered(self, x, y):
+        return self.bit(self.covered_offset, x, y)
+
+    def isFlag(self, x, y):
+        return self.bit(self.flags_offset, x, y)
+
+    def getNeighbors(self, x, y):
+        i = y * self.dim_x + x
+        return self.data[self.neighbors_offset + i // 2] >> (4 * (i % 2)) & NEIGHBORS_MASK
+
+    # full load
+    def toGame(self):
+        '''rebuilds a Minesweeper with the saved state'''
+        num_cells = self.dim_x * self.dim_y
+        data = self.data
+        mines = unpackBits(data[self.mines_offset:self.covered_offset], num_cells)
+        covered = unpackBits(data[self.covered_offset:self.flags_offset], num_cells)
+        flags = unpackBits(data[self.flags_offset:self.neighbors_offset], num_cells)
+        neighbors = unpackNibbles(data[self.neighbors_offset:], num_cells)
+
+        # combine the layers as big integers. each layer is 0/1 per byte, so scaling by a state bit stays inside its byte
+        board = (int.from_bytes(neighbors, 'little')
+                 | int.from_bytes(mines, 'little') * MINE
+                 | int.from_bytes(covered, 'little') * COVERED
+                 | int.from_bytes(flags, 'little') * FLAG).to_bytes(num_cells, 'little')
+
+        game = Minesweeper(self.dim_x, self.dim_y, self.num_mines, seed = self.seed,
+                           first_click_safe = True,
+                           safe_neighbors = bool(self.options & SAFE_NEIGHBORS))
+        game.first_click_safe = bool(self.options & FIRST_CLICK_SAFE)
+        game.setBoard(board, generated = bool(self.options & GENERATED))
+        return game
@@ -0,0 +1,178 @@
+'''headless monte carlo harness. plays many games per board configuration with a pluggable agent
+across all cores and streams aggregate stats as JSON lines. only needs minesweeper.py, not pygame.
+
+usage: python simulate.py --config 16x16:40 --config 30x16:99 --games 100000 --agent simple
+
+an agent is a callable agent(game, rng) that returns an action such as ('reveal', x, y) or ('flag', x, y),
+a list of actions to apply as one batch, or None to give up. see Minesweeper.applyActions for the action kinds.
+classes are instantiated once per game so they can keep state. pass a user strategy as --agent module:function'''
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from minesweeper import Minesweeper, COVERED, FLAG, NEIGHBORS_MASK
+
+OFFSETS = [(i, j) for i in range(-1, 2) for j in range(-1, 2) if i != 0 or j != 0]
+
+# agents
+def random_agent(game, rng):
+    '''reveals a random covered cell'''
+    choices = [xy for xy in game.getTilesXY() if xy not in game.getFlagsXY()]
+    if not choices:
+        return None
+    x, y = rng.choice(choices)
+    return ('reveal', x, y)
+
+class SimpleAgent:
+    '''applies the single cell rules to every revealed number, then guesses at random.
+    all certain moves found by one scan are returned as a single batch'''
+
+    def __call__(self, game, rng):
+        actions = self.scan(game)
+        if actions:
+            return actions
+        return random_agent(game, rng)
+
+    def scan(self, game):
+        actions = []
+        queued = set()
+        dim_x, dim_y = game.dim_x, game.dim_y
+        for i, cell in enumerate(game.board):
+            if cell & COVERED:
+                continue
+            x, y = i % dim_x, i // dim_x
+
+            covered = []
+            flagged = 0
+            for j, k in OFFSETS:
+                if not (0 <= x + j < dim_x and 0 <= y + k < dim_y):
+                    continue
+                neighbor = game.board[i + k * dim_x + j]
+                if neighbor & FLAG:
+                    flagged += 1
+                elif neighbor & COVERED:
+                    covered.append((x + j, y + k))
+            if not covered:
+                continue
+
+            value = cell & NEIGHBORS_MASK
+            if value == flagged:
+                kind = 'reveal'
+            elif value - flagged == len(covered):
+                kind = 'flag'
+            else:
+                continue
+            for xy in covered:
+                if xy not in queued:
+                    queued.add(xy)
+                    actions.append((kind,) + xy)
+        return actions
+
+AGENTS = {'random': random_agent,
+          'simple': SimpleAgent}
+
+def loadAgent(name):
+    '''resolves a built-in agent name or a module:function path'''
+    if name in AGENTS:
+        return AGENTS[name]
+    module, _, function = name.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+# playing
+def playGame(dim_x, dim_y, num_mines, agent, seed, max_moves = None):
+    '''plays a single game and returns (won, clicks, revealed cells, seconds)'''
+    start = time.perf_counter()
+    game = Minesweeper(dim_x, dim_y, num_mines, seed = seed, first_click_safe = True)
+    rng = random.Random(seed)
+    if isinstance(agent, type):
+        agent = agent()
+    max_moves = max_moves or dim_x * dim_y * 2
+
+    clicks = 0
+    while not game.isWin() and not game.isLoss() and clicks < max_moves:
+        actions = agent(game, rng)
+        if actions is None:
+            break
+        if isinstance(actions, tuple):
+            actions = [actions]
+        clicks += len(actions)
+        game.applyActions(actions)
+
+    return game.isWin(), clicks, game.getEmptyTiles(), time.perf_counter() - start
+
+def playChunk(dim_x, dim_y, num_mines, agent_name, seeds):
+    '''worker entry point. plays one game per seed and returns summed stats'''
+    agent = loadAgent(agent_name)
+    totals = {'games': 0, 'wins': 0, 'clicks': 0, 'revealed': 0, 'seconds': 0.0}
+    for seed in seeds:
+        won, clicks, revealed, seconds = playGame(dim_x, dim_y, num_mines, agent, seed)
+        totals['games'] += 1
+        totals['wins'] += won
+        totals['clicks'] += clicks
+        totals['revealed'] += revealed
+        totals['seconds'] += seconds
+    return totals
+
+def summarize(config, agent_name, totals, wall_time, done):
+    games = totals['games'] or 1
+    return {'config': config,
+            'agent': agent_name,
+            'games': totals['games'],
+            'win_rate': totals['wins'] / games,
+            'clicks_per_game': totals['clicks'] / games,
+            'revealed_per_game': totals['revealed'] / games,
+            'seconds_per_game': totals['seconds'] / games,
+            'wall_time': wall_time,
+            'done': done}
+
+def simulate(configs, games, agent_name = 'simple', workers = None, chunk_size = 1000, seed = 0, out = sys.stdout):
+    '''plays games per (dim_x, dim_y, num_mines) config and writes a JSON line of running totals per finished chunk'''
+    workers = workers or os.cpu_count() or 1
+    loadAgent(agent_name) # fail early on a bad agent name
+
+    with ProcessPoolExecutor(workers) as pool:
+        for dim_x, dim_y, num_mines in configs:
+            config = f'{dim_x}x{dim_y}:{num_mines}'
+            start = time.perf_counter()
+
+            # seeds are derived from the base seed so every run of a config is reproducible
+            rng = random.Random(f'{seed}:{config}')
+            seeds = [rng.randrange(2**32) for _ in range(games)]
+            futures = [pool.submit(playChunk, dim_x, dim_y, num_mines, agent_name, seeds[i:i + chunk_size])
+                       for i in range(0, games, chunk_size)]
+
+            totals = {'games': 0, 'wins': 0, 'clicks': 0, 'revealed': 0, 'seconds': 0.0}
+            for n, future in enumerate(as_completed(futures), 1):
+                for key, value in future.result().items():
+                    totals[key] += value
+                line = summarize(config, agent_name, totals, time.perf_counter() - start, n == len(futures))
+                out.write(json.dumps(line) + '\n')
+                out.flush()
+
+def parseConfig(text):
+    dims, _, num_mines = text.partition(':')
+    dim_x, _, dim_y = dims.partition('x')
+    return int(dim_x), int(dim_y), int(num_mines)
+
+def main():
+    parser = argparse.ArgumentParser(description = 'headless minesweeper simulations')
+    parser.add_argument('--config', action = 'append', type = parseConfig,
+                        help = 'board as WIDTHxHEIGHT:MINES, can be repeated (default: the three presets)')
+    parser.add_argument('--games', type = int, default = 10000, help = 'games per config')
+    parser.add_argument('--agent', default = 'simple', help = 'random, simple or module:function')
+    parser.add_argument('--workers', type = int, default = None, help = 'worker processes (default: all cores)')
+    parser.add_argument('--chunk', type = int, default = 1000, help = 'games per work unit')
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+
+    configs = args.config or [(10, 10, 10), (16, 16, 40), (30, 16, 99)]
+    simulate(configs, args.games, args.agent, args.workers, args.chunk, args.seed)
+
+if __name__ == '__main__':
+    main()
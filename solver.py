@@ -0,0 +1,302 @@
+OFFSETS = [(i, j) for i in range(-1, 2) for j in range(-1, 2) if i != 0 or j != 0]
+
+class Solver:
+    '''deduces safe cells and certain mines from the revealed numbers of a Minesweeper game.
+    only uses the public getters, so it works with any object that exposes the same API'''
+
+    def __init__(self, game, trust_flags = False, max_component = 24, max_steps = 20000):
+        self.game = game
+        self.trust_flags = trust_flags # treat player flags as known mines
+        self.max_component = max_component # frontier components larger than this are not enumerated
+        self.max_steps = max_steps # backtracking budget per component
+
+    def neighbors(self, x, y):
+        valid = self.game.validIndex
+        return [(x + i, y + j) for i, j in OFFSETS if valid(x + i, y + j)]
+
+    def inWindow(self, xy):
+        '''True if xy is one of the dim_x by dim_y cells the getters iterate over'''
+        ox, oy = self.game.origin
+        return ox <= xy[0] < ox + self.game.dim_x and oy <= xy[1] < oy + self.game.dim_y
+
+    def findConstraints(self, mines, region = None):
+        '''returns a list of (cells, remaining mines) pairs, one per revealed number bordering covered cells.
+        cells are in world coordinates, so numbers on the edge of a window can include cells outside it.
+        region limits the numbers read to an (x0, y0, x1, y1) box of cells, x1 and y1 excluded'''
+        game = self.game
+        field = game.getNeighbors_field()
+        tiles = game.getTilesXY()
+        ox, oy = game.origin
+
+        if region is None:
+            region = (ox, oy, ox + game.dim_x, oy + game.dim_y)
+            covered = set(tiles)
+        else:
+            # only the box and the cells around it are ever looked up
+            x0, y0, x1, y1 = region
+            covered = {(x, y) for y in range(y0, y1) for x in range(x0, x1)
+                       if game.validIndex(x, y) and (x, y) in tiles}
+
+        # covered cells just outside the box. boards with edges have none outside the window
+        x0, y0, x1, y1 = region
+        ring = [(x, y) for x in range(x0 - 1, x1 + 1) for y in (y0 - 1, y1)]
+        ring += [(x, y) for x in (x0 - 1, x1) for y in range(y0, y1)]
+        covered.update(xy for xy in ring if game.validIndex(*xy) and xy in tiles)
+
+        constraints = []
+        for y in range(max(y0, oy), min(y1, oy + game.dim_y)):
+            row = field[y - oy]
+            for x in range(max(x0, ox), min(x1, ox + game.dim_x)):
+                if (x, y) in covered:
+                    continue
+                value = row[x - ox]
+
+                cells = []
+                remaining = value
+                for xy in self.neighbors(x, y):
+                    if xy in mines:
+                        remaining -= 1
+                    elif xy in covered:
+                        cells.append(xy)
+                if cells:
+                    constraints.append((frozenset(cells), remaining))
+
+        return constraints
+
+    def solve(self, region = None):
+        '''returns (safe, mines) sets of covered cells that are certain from the revealed numbers.
+        region limits the numbers read to an (x0, y0, x1, y1) box, which keeps big boards fast'''
+        tiles = self.game.getTilesXY()
+        safe = set()
+        mines = set(self.game.getFlagsXY()) if self.trust_flags else set()
+
+        # nothing is revealed yet, so nothing can be deduced
+        if len(tiles) == self.game.dim_x * self.game.dim_y:
+            return safe, mines
+
+        constraints = self.findConstraints(mines, region)
+        progress = True
+        while progress:
+            progress = False
+            constraints = self.reduce(constraints, safe, mines)
+
+            # single cell rules
+            for cells, remaining in constraints:
+                if remaining == 0:
+                    progress |= self.mark(cells, safe, mines, False)
+                elif remaining == len(cells):
+                    progress |= self.mark(cells, safe, mines, True)
+            if progress:
+                continue
+
+            # subset and pair rules between constraints that share a cell
+            progress = self.applyPairRules(constraints, safe, mines)
+            if progress:
+                continue
+
+            # bounded exact enumeration over each frontier component
+            for component in self.splitComponents(constraints):
+                result = self.enumerateComponent(component)
+                if result is None:
+                    continue
+                solutions, mine_counts = result
+                for xy, count in mine_counts.items():
+                    if count == 0:
+                        progress |= self.mark((xy,), safe, mines, False)
+                    elif count == solutions:
+                        progress |= self.mark((xy,), safe, mines, True)
+            if progress:
+                continue
+
+            # global mine count. it only covers the window, mines found outside it don't count.
+            # it has to visit every covered cell, so a solve limited to a region skips it
+            if region is not None:
+                break
+            unknown = [xy for xy in tiles if xy not in safe and xy not in mines]
+            mines_left = self.game.getMines() - sum(1 for xy in mines if self.inWindow(xy))
+            if unknown and mines_left == 0:
+                progress = self.mark(unknown, safe, mines, False)
+            elif unknown and mines_left == len(unknown):
+                progress = self.mark(unknown, safe, mines, True)
+
+        return safe, mines
+
+    def hint(self, region = None):
+        '''returns ((x, y), is_mine) for a certain cell the player hasn't dealt with yet, or None.
+        safe cells are preferred over unflagged mines. with a region only cells inside it are returned,
+        since the solve also deduces cells just outside it that the player may not see'''
+        safe, mines = self.solve(region)
+        flags = self.game.getFlagsXY()
+        tiles = self.game.getTilesXY()
+
+        if region is not None:
+            x0, y0, x1, y1 = region
+            safe = [(x, y) for x, y in safe if x0 <= x < x1 and y0 <= y < y1]
+            mines = [(x, y) for x, y in mines if x0 <= x < x1 and y0 <= y < y1]
+
+        for xy in sorted(safe, key = lambda xy: (xy[1], xy[0])):
+            if xy in tiles and xy not in flags:
+                return (xy, False)
+        for xy in sorted(mines, key = lambda xy: (xy[1], xy[0])):
+            if xy not in flags:
+                return (xy, True)
+        return None
+
+    # solve() helper functions
+    def mark(self, cells, safe, mines, is_mine):
+        target = mines if is_mine else safe
+        new = [xy for xy in cells if xy not in target]
+        target.update(new)
+        return bool(new)
+
+    def reduce(self, constraints, safe, mines):
+        '''removes cells already known to be safe or mines from each constraint'''
+        reduced = []
+        for cells, remaining in constraints:
+            remaining -= sum(1 for xy in cells if xy in mines)
+            cells = frozenset(xy for xy in cells if xy not in safe and xy not in mines)
+            if cells:
+                reduced.append((cells, remaining))
+        return reduced
+
+    def applyPairRules(self, constraints, safe, mines):
+        by_cell = {}
+        for k, (cells, _) in enumerate(constraints):
+            for xy in cells:
+                by_cell.setdefault(xy, []).append(k)
+
+        progress = False
+        checked = set()
+        for indices in by_cell.values():
+            for a in indices:
+                for b in indices:
+                    if a == b or (a, b) in checked:
+                        continue
+                    checked.add((a, b))
+
+                    cells_a, rem_a = constraints[a]
+                    cells_b, rem_b = constraints[b]
+                    only_a = cells_a - cells_b
+                    only_b = cells_b - cells_a
+
+                    # subset rule: the cells b has beyond a hold exactly rem_b - rem_a mines
+                    if not only_a and only_b:
+                        if rem_b == rem_a:
+                            progress |= self.mark(only_b, safe, mines, False)
+                        elif rem_b - rem_a == len(only_b):
+                            progress |= self.mark(only_b, safe, mines, True)
+
+                    # pair rule: a can only reach its count if every cell outside b is a mine
+                    elif only_a and rem_a - rem_b == len(only_a):
+                        progress |= self.mark(only_a, safe, mines, True)
+                        progress |= self.mark(only_b, safe, mines, False)
+
+        return progress
+
+    def splitComponents(self, constraints):
+        '''groups constraints into independent components that share no cells'''
+        parent = list(range(len(constraints)))
+
+        def find(k):
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        owner = {}
+        for k, (cells, _) in enumerate(constraints):
+            for xy in cells:
+                if xy in owner:
+                    parent[find(k)] = find(owner[xy])
+                else:
+                    owner[xy] = k
+
+        groups = {}
+        for k in range(len(constraints)):
+            groups.setdefault(find(k), []).append(constraints[k])
+        return list(groups.values())
+
+    def enumerateComponent(self, component):
+        '''backtracks over every consistent mine assignment of a component.
+        returns (solutions, mine_counts) or None if the component is too large'''
+        result = self.tallyComponent(component)
+        if result is None:
+            return None
+        cells, totals = result
+
+        solutions = 0
+        mine_counts = [0] * len(cells)
+        for count, counts in totals.values():
+            solutions += count
+            for i, value in enumerate(counts):
+                mine_counts[i] += value
+        return solutions, dict(zip(cells, mine_counts))
+
+    def tallyComponent(self, component, cancelled = None):
+        '''like enumerateComponent, but keeps the solutions apart by how many mines they use.
+        returns (cells, totals) where totals maps a mine total to [solutions, mine count per cell],
+        or None if the component is too large, runs out of budget or cancelled() turns true'''
+        cells = []
+        seen = set()
+        for constraint_cells, _ in component:
+            for xy in sorted(constraint_cells):
+                if xy not in seen:
+                    seen.add(xy)
+                    cells.append(xy)
+
+        if len(cells) > self.max_component:
+            return None
+
+        cell_constraints = [[] for _ in cells]
+        position = {xy: k for k, xy in enumerate(cells)}
+        remaining = []
+        unassigned = []
+        for c, (constraint_cells, rem) in enumerate(component):
+            remaining.append(rem)
+            unassigned.append(len(constraint_cells))
+            for xy in constraint_cells:
+                cell_constraints[position[xy]].append(c)
+
+        totals = {}
+        assignment = [0] * len(cells)
+        state = {'steps': 0}
+
+        def backtrack(k):
+            # returns False once the step budget runs out or the caller cancels
+            state['steps'] += 1
+            if state['steps'] > self.max_steps:
+                return False
+            if cancelled and state['steps'] % 1024 == 0 and cancelled():
+                return False
+            if k == len(cells):
+                total = totals.setdefault(sum(assignment), [0, [0] * len(cells)])
+                total[0] += 1
+                counts = total[1]
+                for i, value in enumerate(assignment):
+                    counts[i] += value
+                return True
+
+            for value in (0, 1):
+                consistent = True
+                for c in cell_constraints[k]:
+                    remaining[c] -= value
+                    unassigned[c] -= 1
+                    if remaining[c] < 0 or remaining[c] > unassigned[c]:
+                        consistent = False
+
+                finished = True
+                if consistent:
+                    assignment[k] = value
+                    finished = backtrack(k + 1)
+
+                for c in cell_constraints[k]:
+                    remaining[c] += value
+                    unassigned[c] += 1
+                if not finished:
+                    return False
+            assignment[k] = 0
+            return True
+
+        if not backtrack(0) or not totals:
+            return None
+        return cells, totals